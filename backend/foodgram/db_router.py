@@ -0,0 +1,107 @@
+import hashlib
+import random
+import threading
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS, connections
+
+_state = threading.local()
+
+
+def get_client_key(request):
+    """
+    Describes a client by its token, session or IP address,
+    so its writes are remembered across requests.
+    """
+    ident = (request.META.get('HTTP_AUTHORIZATION')
+             or request.COOKIES.get(settings.SESSION_COOKIE_NAME)
+             or request.META.get('REMOTE_ADDR', ''))
+    return 'db_pinned_%s' % hashlib.md5(ident.encode()).hexdigest()
+
+
+def remember_write():
+    """
+    Sends the client's requests within REPLICA_STICKY_SECONDS
+    to the primary database, so the client reads its own writes.
+    """
+    client_key = getattr(_state, 'client_key', None)
+    if client_key:
+        cache.set(client_key, True, settings.REPLICA_STICKY_SECONDS)
+
+
+def pin_to_primary():
+    """
+    Sends the rest of the current request to the primary database
+    and remembers that the client has written.
+    """
+    _state.pinned = True
+    if getattr(_state, 'wrote', False):
+        return
+    _state.wrote = True
+    remember_write()
+
+
+def is_pinned():
+    return (getattr(_state, 'pinned', False)
+            or connections[DEFAULT_DB_ALIAS].in_atomic_block)
+
+
+class ReplicaRouter:
+    """
+    Describes routing of the recipes and users apps: writes go to
+    the primary database, reads go to one of REPLICA_DATABASES unless
+    the request or the client has written recently.
+    """
+    route_app_labels = {'recipes', 'users'}
+
+    def db_for_read(self, model, **hints):
+        if (model._meta.app_label not in self.route_app_labels
+                or not settings.REPLICA_DATABASES or is_pinned()):
+            return DEFAULT_DB_ALIAS
+        return random.choice(settings.REPLICA_DATABASES)
+
+    def db_for_write(self, model, **hints):
+        if model._meta.app_label in self.route_app_labels:
+            pin_to_primary()
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        databases = {DEFAULT_DB_ALIAS, *settings.REPLICA_DATABASES}
+        if obj1._state.db in databases and obj2._state.db in databases:
+            return True
+        return None
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        if db in settings.REPLICA_DATABASES:
+            return False
+        return None
+
+
+class ReplicaPinMiddleware:
+    """
+    Restores the pin of a client that has written recently
+    and clears the request state afterwards.
+    Requests with unsafe methods are pinned from the start,
+    and the sticky period of a client that wrote is counted
+    from the end of the request, after its transaction is committed.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if not settings.REPLICA_DATABASES:
+            return self.get_response(request)
+        _state.client_key = get_client_key(request)
+        _state.wrote = False
+        unsafe = request.method not in ('GET', 'HEAD', 'OPTIONS')
+        _state.pinned = unsafe or bool(cache.get(_state.client_key))
+        try:
+            return self.get_response(request)
+        finally:
+            if unsafe or _state.wrote:
+                remember_write()
+            _state.client_key = None
+            _state.pinned = False
+            _state.wrote = False
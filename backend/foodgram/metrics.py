@@ -0,0 +1,261 @@
+import atexit
+import glob
+import json
+import os
+import threading
+import time
+from contextlib import ExitStack, contextmanager
+
+from django.conf import settings
+from django.db import connections
+from django.http import HttpResponse
+
+LATENCY_BUCKETS = (
+    0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, float('inf')
+)
+
+_lock = threading.Lock()
+_counters = {}
+_histograms = {}
+_last_flush = 0
+_gauge_collectors = []
+
+
+def _key(name, labels):
+    return name, tuple(sorted(labels.items()))
+
+
+def inc(name, value=1, **labels):
+    """Increments the counter with the labels."""
+    key = _key(name, labels)
+    with _lock:
+        _counters[key] = _counters.get(key, 0) + value
+
+
+def observe(name, value, **labels):
+    """Adds the value to the histogram with the labels."""
+    key = _key(name, labels)
+    with _lock:
+        buckets = _histograms.get(key)
+        if buckets is None:
+            # bucket counts, then sum and count of observations
+            buckets = _histograms[key] = [0] * (len(LATENCY_BUCKETS) + 2)
+        for number, bound in enumerate(LATENCY_BUCKETS):
+            if value <= bound:
+                buckets[number] += 1
+                break
+        buckets[-2] += value
+        buckets[-1] += 1
+
+
+@contextmanager
+def timer(name, **labels):
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        observe(name, time.perf_counter() - start, **labels)
+
+
+def register_gauges(collector):
+    """
+    Registers a function returning [(name, labels, value), ...],
+    which is called on every scrape of /metrics.
+    """
+    _gauge_collectors.append(collector)
+    return collector
+
+
+def get_file_path(pid=None):
+    return os.path.join(
+        settings.METRICS_DIR, f'metrics_{pid or os.getpid()}.json'
+    )
+
+
+def write_file(path, counters, histograms):
+    """Replaces the file atomically, so readers never see a partial one."""
+    data = {
+        'counters': [[name, dict(labels), value]
+                     for (name, labels), value in counters.items()],
+        'histograms': [[name, dict(labels), buckets]
+                       for (name, labels), buckets in histograms.items()],
+    }
+    os.makedirs(settings.METRICS_DIR, exist_ok=True)
+    with open(f'{path}.tmp', 'w') as output:
+        json.dump(data, output)
+    os.replace(f'{path}.tmp', path)
+
+
+def read_file(path, counters, histograms):
+    """Adds counters and histograms from the file to the given ones."""
+    try:
+        with open(path) as source:
+            data = json.load(source)
+    except (OSError, ValueError):
+        return
+    for name, labels, value in data['counters']:
+        key = _key(name, labels)
+        counters[key] = counters.get(key, 0) + value
+    for name, labels, buckets in data['histograms']:
+        key = _key(name, labels)
+        total = histograms.setdefault(key, [0] * len(buckets))
+        for number, value in enumerate(buckets):
+            total[number] += value
+
+
+def flush(force=False):
+    """
+    Writes metrics of this process to its own file in METRICS_DIR
+    at most once per METRICS_FLUSH_INTERVAL, unless forced.
+    """
+    global _last_flush
+    now = time.monotonic()
+    if not force and now - _last_flush < settings.METRICS_FLUSH_INTERVAL:
+        return
+    with _lock:
+        _last_flush = now
+        counters = dict(_counters)
+        histograms = {key: list(buckets)
+                      for key, buckets in _histograms.items()}
+    write_file(get_file_path(), counters, histograms)
+
+
+atexit.register(flush, force=True)
+
+
+def reset():
+    """
+    Drops metrics collected in memory of this process, called in
+    forked workers, so they don't report what the master counted.
+    """
+    global _last_flush
+    with _lock:
+        _counters.clear()
+        _histograms.clear()
+        _last_flush = 0
+
+
+def archive(pid):
+    """
+    Merges the file of the exited process into the archive file
+    and removes it, so totals stay the same and files of recycled
+    workers don't pile up. Called by the gunicorn master only.
+    """
+    path = get_file_path(pid)
+    if not os.path.exists(path):
+        return
+    archive_path = get_file_path('archive')
+    counters, histograms = {}, {}
+    read_file(archive_path, counters, histograms)
+    read_file(path, counters, histograms)
+    write_file(archive_path, counters, histograms)
+    os.remove(path)
+
+
+def clear():
+    """Removes files of all processes, called on server start."""
+    for path in glob.glob(os.path.join(settings.METRICS_DIR, 'metrics_*')):
+        os.remove(path)
+
+
+def collect():
+    """
+    Returns counters and histograms summed over all processes,
+    alive ones and archived.
+    """
+    flush(force=True)
+    counters, histograms = {}, {}
+    paths = glob.glob(os.path.join(settings.METRICS_DIR, 'metrics_*.json'))
+    for path in paths:
+        read_file(path, counters, histograms)
+    return counters, histograms
+
+
+def format_labels(labels, **extra):
+    labels = [*labels, *extra.items()]
+    if not labels:
+        return ''
+    return '{%s}' % ','.join(
+        '%s="%s"' % (name, str(value).replace('\\', '\\\\')
+                     .replace('"', '\\"'))
+        for name, value in labels
+    )
+
+
+def render_histogram(name, labels, buckets):
+    cumulative = 0
+    for bound, value in zip(LATENCY_BUCKETS, buckets):
+        cumulative += value
+        le = '+Inf' if bound == float('inf') else bound
+        yield f'{name}_bucket{format_labels(labels, le=le)} {cumulative}'
+    yield f'{name}_sum{format_labels(labels)} {buckets[-2]}'
+    yield f'{name}_count{format_labels(labels)} {buckets[-1]}'
+
+
+def render():
+    """Returns all metrics in Prometheus text format."""
+    counters, histograms = collect()
+    gauges = {}
+    for collector in _gauge_collectors:
+        for name, labels, value in collector():
+            gauges[_key(name, labels)] = value
+    lines = []
+    for kind, values in (('counter', counters), ('gauge', gauges)):
+        last_name = None
+        for (name, labels), value in sorted(values.items()):
+            if name != last_name:
+                lines.append(f'# TYPE {name} {kind}')
+                last_name = name
+            lines.append(f'{name}{format_labels(labels)} {value}')
+    last_name = None
+    for (name, labels), buckets in sorted(histograms.items()):
+        if name != last_name:
+            lines.append(f'# TYPE {name} histogram')
+            last_name = name
+        lines.extend(render_histogram(name, labels, buckets))
+    return '\n'.join(lines) + '\n'
+
+
+def metrics_view(request):
+    return HttpResponse(
+        render(), content_type='text/plain; version=0.0.4; charset=utf-8'
+    )
+
+
+def record_query(execute, sql, params, many, context):
+    alias = context['connection'].alias
+    inc('foodgram_db_queries_total', alias=alias)
+    with timer('foodgram_db_query_duration_seconds', alias=alias):
+        return execute(sql, params, many, context)
+
+
+class MetricsMixin:
+    """
+    Describes a mixin for APIView counting requests by status and
+    observing latency and DB queries of each view (and viewset action).
+    """
+
+    def get_metrics_view_name(self):
+        name = type(self).__name__
+        action = getattr(self, 'action', None)
+        return f'{name}.{action}' if action else name
+
+    def dispatch(self, request, *args, **kwargs):
+        start = time.perf_counter()
+        with ExitStack() as stack:
+            for alias in connections:
+                stack.enter_context(
+                    connections[alias].execute_wrapper(record_query)
+                )
+            response = super().dispatch(request, *args, **kwargs)
+        view = self.get_metrics_view_name()
+        observe(
+            'foodgram_view_duration_seconds',
+            time.perf_counter() - start, view=view
+        )
+        inc(
+            'foodgram_view_requests_total',
+            view=view, method=request.method, status=response.status_code
+        )
+        flush()
+        return response
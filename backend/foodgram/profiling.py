@@ -0,0 +1,111 @@
+import cProfile
+import io
+import marshal
+import pstats
+import time
+from contextlib import ExitStack
+
+from django.db import connections
+from rest_framework.authentication import TokenAuthentication
+from rest_framework.exceptions import AuthenticationFailed
+
+PROFILE_HEADER = 'HTTP_X_PROFILE'
+PROFILE_PARAMETER = 'profile'
+REPORT_LINES = 60
+REPORT_QUERIES = 50
+
+
+def get_staff_user(request):
+    """Returns the staff user of the session or the token or None."""
+    user = getattr(request, 'user', None)
+    if user is None or not user.is_authenticated:
+        try:
+            result = TokenAuthentication().authenticate(request)
+        except AuthenticationFailed:
+            return None
+        user = result[0] if result else None
+    if user is not None and user.is_staff:
+        return user
+    return None
+
+
+class QueryTimer:
+    """Describes execute_wrapper collecting duration of every query."""
+
+    def __init__(self):
+        self.queries = []
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.queries.append((
+                time.perf_counter() - start, context['connection'].alias, sql
+            ))
+
+    def report(self):
+        lines = [f'{len(self.queries)} queries in '
+                 f'{sum(query[0] for query in self.queries):.3f} s']
+        slowest = sorted(self.queries, reverse=True)[:REPORT_QUERIES]
+        for duration, alias, sql in slowest:
+            lines.append(f'{duration:.4f} s [{alias}] {sql}')
+        return '\n'.join(lines)
+
+
+class ProfilingMiddleware:
+    """
+    Describes middleware profiling requests of staff users,
+    which are sent with X-Profile header or ?profile= parameter.
+    The request is run under cProfile with all SQL queries timed,
+    the result is saved as RequestProfile, which can be downloaded
+    from the admin, and its id is returned in X-Profile-Id header.
+    Other requests only pay for the header and parameter lookup.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if (PROFILE_HEADER not in request.META
+                and PROFILE_PARAMETER not in request.GET):
+            return self.get_response(request)
+        user = get_staff_user(request)
+        if user is None:
+            return self.get_response(request)
+        return self.profile(request, user)
+
+    def profile(self, request, user):
+        from recipes.models import RequestProfile
+
+        query_timer = QueryTimer()
+        profiler = cProfile.Profile()
+        start = time.perf_counter()
+        with ExitStack() as stack:
+            for alias in connections:
+                stack.enter_context(
+                    connections[alias].execute_wrapper(query_timer)
+                )
+            profiler.enable()
+            try:
+                response = self.get_response(request)
+            finally:
+                profiler.disable()
+        duration = time.perf_counter() - start
+
+        report = io.StringIO()
+        stats = pstats.Stats(profiler, stream=report)
+        stats.sort_stats('cumulative').print_stats(REPORT_LINES)
+        request_profile = RequestProfile.objects.create(
+            user=user,
+            method=request.method,
+            path=request.get_full_path()[:2000],
+            status_code=response.status_code,
+            duration=duration,
+            queries_count=len(query_timer.queries),
+            queries_duration=sum(query[0] for query in query_timer.queries),
+            report=f'{query_timer.report()}\n\n{report.getvalue()}',
+            stats=marshal.dumps(stats.stats),
+        )
+        response['X-Profile-Id'] = request_profile.id
+        return response
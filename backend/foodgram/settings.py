@@ -33,6 +33,9 @@ MIDDLEWARE = [
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    'foodgram.db_router.ReplicaPinMiddleware',
+    'foodgram.slow_queries.SlowQueryLogMiddleware',
+    'foodgram.profiling.ProfilingMiddleware',
 ]
 
 ROOT_URLCONF = 'foodgram.urls'
@@ -66,6 +69,37 @@ DATABASES = {
     }
 }
 
+REPLICA_DATABASES = []
+for index, host in enumerate(
+    filter(None, os.environ.get('DB_REPLICA_HOSTS', '').split(','))
+):
+    REPLICA_DATABASES.append(f'replica_{index}')
+    DATABASES[f'replica_{index}'] = {
+        **DATABASES['default'],
+        'HOST': host.strip(),
+        'TEST': {'MIRROR': 'default'},
+    }
+REPLICA_STICKY_SECONDS = int(os.environ.get('REPLICA_STICKY_SECONDS', 5))
+
+DATABASE_ROUTERS = ['foodgram.db_router.ReplicaRouter']
+
+PASSWORD_HASH_ITERATIONS = int(
+    os.environ.get('PASSWORD_HASH_ITERATIONS', 180000)
+)
+
+PASSWORD_HASHER = os.environ.get(
+    'PASSWORD_HASHER', 'users.hashers.ConfigurablePBKDF2PasswordHasher'
+)
+
+# Only hashers without extra dependencies are listed, Argon2 and BCrypt
+# need argon2-cffi or bcrypt in requirements.txt before they are used.
+PASSWORD_HASHERS = [PASSWORD_HASHER] + [
+    hasher for hasher in (
+        'users.hashers.ConfigurablePBKDF2PasswordHasher',
+        'django.contrib.auth.hashers.PBKDF2SHA1PasswordHasher',
+    ) if hasher != PASSWORD_HASHER
+]
+
 AUTH_PASSWORD_VALIDATORS = [
     {
         'NAME': 'django.contrib.auth.password_validation.UserAttributeSimilarityValidator',
@@ -81,6 +115,19 @@ AUTH_PASSWORD_VALIDATORS = [
     },
 ]
 
+# Login limits, throttles, concurrency slots, replica stickiness
+# and catalogue invalidation must be shared by all gunicorn workers:
+# LocMemCache is per process and is meant for development only,
+# infra/docker-compose.yml runs memcached.
+CACHES = {
+    'default': {
+        'BACKEND': os.environ.get(
+            'CACHE_BACKEND', 'django.core.cache.backends.locmem.LocMemCache'
+        ),
+        'LOCATION': os.environ.get('CACHE_LOCATION', ''),
+    }
+}
+
 LANGUAGE_CODE = 'ru-ru'
 
 TIME_ZONE = 'UTC'
@@ -112,10 +159,77 @@ REST_FRAMEWORK = {
     'DEFAULT_PAGINATION_CLASS': 'rest_framework.pagination.PageNumberPagination',
     'PAGE_SIZE': 6,
     'DEFAULT_VERSIONING_CLASS': 'rest_framework.versioning.NamespaceVersioning',
+    'NUM_PROXIES': 1,
+    'DEFAULT_THROTTLE_CLASSES': [
+        'recipes.throttling.UserSlidingWindowThrottle',
+        'recipes.throttling.IPSlidingWindowThrottle',
+    ],
+    'DEFAULT_THROTTLE_RATES': {
+        'auth_ip': '20/min',
+        'write_user': '120/min',
+        'write_ip': '300/min',
+        'download_user': '10/min',
+        'download_ip': '30/min',
+    },
 }
 
 RECIPES_LIMIT = 3
 
+FAST_SERIALIZATION = True
+
+CATALOGUE_CACHE_TIMEOUT = 5 * 60
+FACETS_CACHE_TIMEOUT = 30
+
+TIMELINE_FANOUT_LIMIT = 1000
+TIMELINE_BACKFILL = 50
+TIMELINE_FOLLOWERS_CACHE_TIMEOUT = 10 * 60
+
+LOGIN_ATTEMPTS_PER_EMAIL = 5
+LOGIN_ATTEMPTS_PER_IP = 20
+LOGIN_ATTEMPTS_TIMEOUT = 15 * 60
+
+METRICS_DIR = os.environ.get('METRICS_DIR', '/tmp/foodgram-metrics')
+METRICS_FLUSH_INTERVAL = 1
+
+SLOW_QUERY_THRESHOLD = float(os.environ.get('SLOW_QUERY_THRESHOLD', 0.2))
+SLOW_QUERY_SAMPLE_RATE = float(os.environ.get('SLOW_QUERY_SAMPLE_RATE', 1))
+SLOW_QUERY_DEDUPE_INTERVAL = 10 * 60
+
+# All gunicorn workers write the slow query log, so it is never rotated
+# by the workers: the file set by SLOW_QUERY_LOG is rotated by logrotate
+# and reopened by WatchedFileHandler, without it the log goes to stderr,
+# which is rotated by docker (see infra/docker-compose.yml).
+SLOW_QUERY_LOG = os.environ.get('SLOW_QUERY_LOG')
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'slow_queries': {
+            'class': 'logging.handlers.WatchedFileHandler',
+            'filename': SLOW_QUERY_LOG,
+            'encoding': 'utf-8',
+            'delay': True,
+        } if SLOW_QUERY_LOG else {
+            'class': 'logging.StreamHandler',
+        },
+    },
+    'loggers': {
+        'foodgram.slow_queries': {
+            'handlers': ['slow_queries'],
+            'level': 'WARNING',
+            'propagate': False,
+        },
+    },
+}
+
+CONCURRENCY_LIMITS = {
+    'download': {'limit': 4, 'timeout': 2},
+    'recipe_write': {'limit': 4, 'timeout': 2},
+}
+CONCURRENCY_LEASE = 60
+CONCURRENCY_RETRY_AFTER = 5
+
 
 DJOSER = {
     'SERIALIZERS': {'user': 'users.serializers.UserSerializerModified'},
@@ -0,0 +1,143 @@
+import hashlib
+import logging
+import os
+import random
+import re
+import threading
+import time
+import traceback
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.db import DatabaseError, connections, transaction
+
+logger = logging.getLogger(__name__)
+
+STRING_RE = re.compile(r"'(?:[^']|'')*'")
+NUMBER_RE = re.compile(r'\b\d+(?:\.\d+)?\b')
+PARAMS_LIST_RE = re.compile(r'\(\s*(?:%s|\?)(?:\s*,\s*(?:%s|\?))*\s*\)')
+PLACEHOLDER_RE = re.compile(r'%s|\?')
+SPACES_RE = re.compile(r'\s+')
+
+PACKAGE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+_state = threading.local()
+_lock = threading.Lock()
+_last_logged = {}
+_suppressed = {}
+
+
+def normalize_sql(sql):
+    """
+    Replaces literals and parameters with '?' and lists of them
+    with '(...)', so queries differing in values look the same.
+    """
+    sql = STRING_RE.sub('?', sql)
+    sql = NUMBER_RE.sub('?', sql)
+    sql = PARAMS_LIST_RE.sub('(...)', sql)
+    sql = PLACEHOLDER_RE.sub('?', sql)
+    return SPACES_RE.sub(' ', sql).strip()
+
+
+def get_call_site():
+    """
+    Returns the innermost frame of the project code,
+    skipping the instrumentation in this package.
+    """
+    for frame in reversed(traceback.extract_stack()):
+        if (frame.filename.startswith(settings.BASE_DIR)
+                and 'site-packages' not in frame.filename
+                and not frame.filename.startswith(PACKAGE_DIR)):
+            return f'{frame.filename}:{frame.lineno} in {frame.name}'
+    return 'unknown'
+
+
+def explain(connection, sql, params):
+    """
+    Returns the plan of a SELECT query or None.
+    In a transaction EXPLAIN runs in a savepoint,
+    so its failure doesn't break the transaction.
+    """
+    if not sql.lstrip().upper().startswith('SELECT'):
+        return None
+    prefix = connection.ops.explain_query_prefix()
+    try:
+        with transaction.atomic(using=connection.alias):
+            with connection.cursor() as cursor:
+                cursor.execute(f'{prefix} {sql}', params)
+                return '\n'.join(
+                    ' '.join(str(column) for column in row)
+                    for row in cursor.fetchall()
+                )
+    except DatabaseError as error:
+        return f'EXPLAIN failed: {error}'
+
+
+def should_log(fingerprint):
+    """
+    Returns the number of occurrences since the last record
+    of the fingerprint, or 0 if it was logged less than
+    SLOW_QUERY_DEDUPE_INTERVAL seconds ago.
+    """
+    now = time.monotonic()
+    with _lock:
+        _suppressed[fingerprint] = _suppressed.get(fingerprint, 0) + 1
+        last = _last_logged.get(fingerprint)
+        interval = settings.SLOW_QUERY_DEDUPE_INTERVAL
+        if last is not None and now - last < interval:
+            return 0
+        _last_logged[fingerprint] = now
+        return _suppressed.pop(fingerprint)
+
+
+def log_slow_query(execute, sql, params, many, context):
+    if getattr(_state, 'explaining', False):
+        return execute(sql, params, many, context)
+    start = time.perf_counter()
+    result = execute(sql, params, many, context)
+    duration = time.perf_counter() - start
+    if (duration < settings.SLOW_QUERY_THRESHOLD
+            or random.random() >= settings.SLOW_QUERY_SAMPLE_RATE):
+        return result
+    normalized = normalize_sql(sql)
+    fingerprint = hashlib.md5(normalized.encode()).hexdigest()[:12]
+    count = should_log(fingerprint)
+    if not count:
+        return result
+    connection = context['connection']
+    plan = None
+    if not many:
+        _state.explaining = True
+        try:
+            plan = explain(connection, sql, params)
+        finally:
+            _state.explaining = False
+    logger.warning(
+        'Slow query %s on %s: %.3f s, %s occurrence(s)\n'
+        'Call site: %s\nSQL: %s\nPlan:\n%s',
+        fingerprint, connection.alias, duration, count,
+        get_call_site(), normalized, plan or '-'
+    )
+    return result
+
+
+class SlowQueryLogMiddleware:
+    """
+    Describes middleware logging queries slower than
+    SLOW_QUERY_THRESHOLD seconds to the 'foodgram.slow_queries' logger
+    with normalized SQL, call site and EXPLAIN output.
+    Only SLOW_QUERY_SAMPLE_RATE of slow queries are considered,
+    and every fingerprint is logged at most once per
+    SLOW_QUERY_DEDUPE_INTERVAL seconds with the number of occurrences.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        with ExitStack() as stack:
+            for alias in connections:
+                stack.enter_context(
+                    connections[alias].execute_wrapper(log_slow_query)
+                )
+            return self.get_response(request)
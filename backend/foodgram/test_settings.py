@@ -0,0 +1,35 @@
+import tempfile
+
+from .settings import *  # noqa: F401,F403
+from .settings import DATABASES, REST_FRAMEWORK
+
+DATABASES = {
+    'default': {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': 'test.sqlite3',
+    },
+}
+# a second alias of the same database, tests of the replica router
+# enable it with override_settings(REPLICA_DATABASES=['replica_0'])
+DATABASES['replica_0'] = {
+    **DATABASES['default'],
+    'TEST': {'MIRROR': 'default'},
+}
+REPLICA_DATABASES = []
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    }
+}
+
+PASSWORD_HASHERS = ['django.contrib.auth.hashers.MD5PasswordHasher']
+
+REST_FRAMEWORK = {
+    **REST_FRAMEWORK,
+    'DEFAULT_THROTTLE_CLASSES': [],
+}
+
+MEDIA_ROOT = tempfile.mkdtemp(prefix='foodgram-media-')
+METRICS_DIR = tempfile.mkdtemp(prefix='foodgram-metrics-')
+SLOW_QUERY_SAMPLE_RATE = 0
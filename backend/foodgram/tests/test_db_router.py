@@ -0,0 +1,117 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connections, transaction
+from django.test import TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+
+from foodgram import db_router
+from foodgram.db_router import ReplicaRouter, get_client_key
+from recipes.cards import refresh_cards
+from recipes.models import Favorite, Recipe
+
+User = get_user_model()
+
+
+@override_settings(REPLICA_DATABASES=['replica_0'])
+class ReplicaRouterTests(TransactionTestCase):
+    databases = {'default', 'replica_0'}
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(
+            email='reader@example.com', username='reader',
+            first_name='Иван', last_name='Иванов', password='password'
+        )
+        self.recipe = Recipe.objects.create(
+            author=self.user, name='Борщ', text='Сварить',
+            cooking_time=60, image='recipes/images/borsch.png'
+        )
+        refresh_cards([self.recipe.id])
+        self.client = self.get_client(self.user)
+        # writes outside of requests pin the thread to the primary
+        db_router._state.pinned = False
+
+    def get_client(self, user):
+        client = APIClient()
+        token = Token.objects.create(user=user)
+        client.credentials(HTTP_AUTHORIZATION=f'Token {token.key}')
+        return client
+
+    def get_recipe_queries(self, method, path):
+        """
+        Returns the response and the numbers of queries
+        to recipes tables on the primary and the replica.
+        """
+        with CaptureQueriesContext(connections['default']) as primary, \
+                CaptureQueriesContext(connections['replica_0']) as replica:
+            response = getattr(self.client, method)(path)
+        return response, *(
+            sum('recipes_' in query['sql'] for query in context)
+            for context in (primary, replica)
+        )
+
+    def test_reads_go_to_replica(self):
+        response, primary, replica = self.get_recipe_queries(
+            'get', f'/api/recipes/{self.recipe.id}/'
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(primary, 0)
+        self.assertGreater(replica, 0)
+
+    def test_unsafe_request_pins_client(self):
+        Favorite.objects.create(user=self.user, recipe=self.recipe)
+        cache.clear()
+        response, primary, replica = self.get_recipe_queries(
+            'delete', f'/api/recipes/{self.recipe.id}/favorite/'
+        )
+        self.assertEqual(response.status_code, 204)
+        self.assertEqual(replica, 0)
+        self.assertTrue(cache.get(get_client_key(response.wsgi_request)))
+        response, primary, replica = self.get_recipe_queries(
+            'get', f'/api/recipes/{self.recipe.id}/'
+        )
+        self.assertFalse(response.data['is_favorited'])
+        self.assertGreater(primary, 0)
+        self.assertEqual(replica, 0)
+
+    def test_failed_unsafe_request_pins_client(self):
+        response, primary, replica = self.get_recipe_queries(
+            'delete', f'/api/recipes/{self.recipe.id}/favorite/'
+        )
+        self.assertEqual(response.status_code, 400)
+        self.assertTrue(cache.get(get_client_key(response.wsgi_request)))
+
+    def test_other_clients_read_from_replica(self):
+        self.client.get(f'/api/recipes/{self.recipe.id}/favorite/')
+        other = User.objects.create_user(
+            email='other@example.com', username='other',
+            first_name='Пётр', last_name='Петров', password='password'
+        )
+        self.client = self.get_client(other)
+        _, primary, replica = self.get_recipe_queries(
+            'get', f'/api/recipes/{self.recipe.id}/'
+        )
+        self.assertEqual(primary, 0)
+        self.assertGreater(replica, 0)
+
+    def test_pin_expires(self):
+        self.client.get(f'/api/recipes/{self.recipe.id}/favorite/')
+        cache.clear()
+        _, primary, replica = self.get_recipe_queries(
+            'get', f'/api/recipes/{self.recipe.id}/'
+        )
+        self.assertEqual(primary, 0)
+        self.assertGreater(replica, 0)
+
+    def test_reads_in_transaction_go_to_primary(self):
+        router = ReplicaRouter()
+        self.assertEqual(router.db_for_read(Recipe), 'replica_0')
+        with transaction.atomic():
+            self.assertEqual(router.db_for_read(Recipe), 'default')
+
+    def test_replicas_are_not_migrated(self):
+        router = ReplicaRouter()
+        self.assertIs(router.allow_migrate('replica_0', 'recipes'), False)
+        self.assertIsNone(router.allow_migrate('default', 'recipes'))
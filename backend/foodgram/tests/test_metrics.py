@@ -0,0 +1,62 @@
+import glob
+import os
+import tempfile
+
+from django.test import SimpleTestCase, override_settings
+
+from foodgram import metrics
+
+OTHER_PID = 1
+
+
+class MetricsFilesTests(SimpleTestCase):
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        settings = override_settings(METRICS_DIR=directory.name)
+        settings.enable()
+        self.addCleanup(settings.disable)
+        metrics.reset()
+        self.addCleanup(metrics.reset)
+
+    def count_requests(self, value):
+        metrics.inc('foodgram_test_total', value, view='test')
+        metrics.observe('foodgram_test_seconds', 0.1, view='test')
+
+    def exit_other_process(self):
+        """Stores metrics of this process as of an exited one."""
+        metrics.flush(force=True)
+        os.replace(metrics.get_file_path(), metrics.get_file_path(OTHER_PID))
+        metrics.reset()
+        metrics.archive(OTHER_PID)
+
+    def get_totals(self):
+        counters, histograms = metrics.collect()
+        key = metrics._key('foodgram_test_total', {'view': 'test'})
+        histogram = histograms.get(
+            metrics._key('foodgram_test_seconds', {'view': 'test'})
+        )
+        return counters.get(key, 0), histogram and histogram[-1]
+
+    def test_exited_processes_are_archived(self):
+        for value in (2, 3):
+            self.count_requests(value)
+            self.exit_other_process()
+        self.count_requests(4)
+        self.assertEqual(self.get_totals(), (9, 3))
+        self.assertEqual(
+            sorted(os.path.basename(path)
+                   for path in glob.glob(metrics.get_file_path('*'))),
+            sorted(['metrics_archive.json',
+                    os.path.basename(metrics.get_file_path())])
+        )
+
+    def test_archive_of_process_without_file(self):
+        metrics.archive(OTHER_PID)
+        self.assertEqual(self.get_totals(), (0, None))
+
+    def test_reset(self):
+        self.count_requests(5)
+        metrics.reset()
+        self.assertEqual(self.get_totals(), (0, None))
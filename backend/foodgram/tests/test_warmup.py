@@ -0,0 +1,41 @@
+import os
+import subprocess
+import sys
+import tempfile
+
+from django.conf import settings
+from django.test import SimpleTestCase
+
+WARM_UP = (
+    'import django; django.setup(); '
+    'from foodgram.warmup import warm_up; warm_up(); '
+    'print("warmed up")'
+)
+
+
+class WarmUpTests(SimpleTestCase):
+
+    def test_unmigrated_database(self):
+        """
+        Runs warm-up in a fresh process, where the relative name
+        of the test database points to a new empty file,
+        as the gunicorn master does before migrate.
+        """
+        with tempfile.TemporaryDirectory() as path:
+            result = subprocess.run(
+                [sys.executable, '-c', WARM_UP],
+                cwd=path,
+                env={
+                    **os.environ,
+                    'DJANGO_SETTINGS_MODULE': 'foodgram.test_settings',
+                    'PYTHONPATH': settings.BASE_DIR,
+                },
+                capture_output=True,
+                text=True,
+                timeout=60,
+            )
+        self.assertEqual(result.returncode, 0, result.stderr)
+        self.assertEqual(result.stdout, 'warmed up\n')
+        self.assertIn('Warm-up step failed: tags', result.stderr)
+        self.assertIn('Warm-up step failed: ingredients', result.stderr)
+        self.assertIn('no such table', result.stderr)
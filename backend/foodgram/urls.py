@@ -2,8 +2,11 @@ from django.conf.urls import include
 from django.urls import path
 from django.contrib import admin
 
+from .metrics import metrics_view
+
 urlpatterns = [
     path('admin/', admin.site.urls),
+    path('metrics', metrics_view, name='metrics'),
     path('api/', include('recipes.urls')),
     path('api/', include('users.urls')),
 ]
@@ -0,0 +1,42 @@
+import logging
+
+from django.core.cache import caches
+from django.db import connections
+from django.urls import get_resolver
+
+logger = logging.getLogger(__name__)
+
+
+def close_caches():
+    for cache in caches.all():
+        cache.close()
+
+
+def warm_up():
+    """
+    Describes the work done once in the gunicorn master after the app
+    is preloaded: URL patterns are resolved, the catalogue is put into
+    the cache and the PDF font is parsed, so forked workers inherit
+    all of it instead of paying for it on their first requests.
+    Database and cache connections are closed, so workers don't share
+    the master's sockets.
+    Every step is best-effort: when the database is not migrated
+    or not up yet, or the cache is unreachable, the step is logged
+    and skipped, and workers do the work on demand.
+    """
+    from recipes.catalogue import get_ingredients, get_tags
+    from recipes.pdf import register_font
+
+    steps = (
+        ('URL patterns', lambda: get_resolver().reverse_dict),
+        ('tags', get_tags),
+        ('ingredients', get_ingredients),
+        ('PDF font', register_font),
+        ('closing database connections', connections.close_all),
+        ('closing cache connections', close_caches),
+    )
+    for name, step in steps:
+        try:
+            step()
+        except Exception:
+            logger.warning('Warm-up step failed: %s', name, exc_info=True)
@@ -0,0 +1,61 @@
+import multiprocessing
+import os
+
+bind = os.environ.get('GUNICORN_BIND', '0.0.0.0:8000')
+
+# The app is imported once in the master, workers share its memory
+# copy-on-write and are forked already warmed up (see when_ready).
+preload_app = True
+
+workers = int(os.environ.get(
+    'GUNICORN_WORKERS', multiprocessing.cpu_count() * 2 + 1
+))
+threads = int(os.environ.get('GUNICORN_THREADS', 4))
+worker_class = 'gthread'
+
+# Workers are recycled to cap memory growth, the jitter keeps them
+# from restarting all at once.
+max_requests = int(os.environ.get('GUNICORN_MAX_REQUESTS', 1000))
+max_requests_jitter = int(os.environ.get('GUNICORN_MAX_REQUESTS_JITTER', 100))
+
+timeout = int(os.environ.get('GUNICORN_TIMEOUT', 30))
+
+
+def post_fork(server, worker):
+    from foodgram import metrics
+
+    metrics.reset()
+
+
+def worker_exit(server, worker):
+    from foodgram import metrics
+
+    metrics.flush(force=True)
+
+
+def child_exit(server, worker):
+    from foodgram import metrics
+
+    metrics.archive(worker.pid)
+
+
+def when_ready(server):
+    from foodgram import metrics
+    from foodgram.warmup import warm_up
+
+    metrics.clear()
+    warm_up()
+    server.log.info('Application is warmed up')
+    check_cache(server)
+
+
+def check_cache(server):
+    from django.conf import settings
+
+    backend = settings.CACHES['default']['BACKEND']
+    if server.cfg.workers > 1 and backend.endswith('.LocMemCache'):
+        server.log.warning(
+            'LocMemCache is local to each worker: login limits, throttles, '
+            'concurrency slots and catalogue invalidation are not shared, '
+            'set CACHE_BACKEND and CACHE_LOCATION to a shared cache'
+        )
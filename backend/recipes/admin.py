@@ -1,7 +1,29 @@
 from django.contrib import admin
-
+from django.http import HttpResponse
+from django.shortcuts import get_object_or_404
+from django.urls import path, reverse
+from django.utils.html import format_html
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+from .cards import refresh_cards
+from .ingredient_index import get_recipes_ingredients, update_ingredient_index
 from .models import (Favorite, Ingredient, IngredientInRecipe, Recipe,
-                     ShoppingCart, Tag, TagsInRecipe)
+                     RequestProfile, ShoppingCart, Tag, TagsInRecipe)
+from .paginators import EstimatedCountPaginator
+from .shopping_list import (get_recipes_delta, rebuild_shopping_lists,
+                            update_shopping_lists)
+from .tag_mask import update_tags_mask
+
+
+class LargeTableAdmin(admin.ModelAdmin):
+    """
+    Describes base admin for tables with millions of rows:
+    estimated count of unfiltered changelist and
+    no second COUNT(*) for filtered one.
+    """
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
 
 
 class TagAdmin(admin.ModelAdmin):
@@ -19,40 +41,193 @@ class TagsInRecipeInline(admin.TabularInline):
 class IngredientInRecipeAdminInline(admin.TabularInline):
     model = IngredientInRecipe
     extra = 1
+    autocomplete_fields = ('ingredient',)
 
 
-class RecipeAdmin(admin.ModelAdmin):
+class RecipeAdmin(LargeTableAdmin):
     list_display = ('id', 'name', 'author', 'in_favorites')
+    list_select_related = ('author',)
     inlines = (IngredientInRecipeAdminInline, TagsInRecipeInline)
-    search_fields = ('author', 'name')
-    list_filter = ('author', 'name', 'tags')
+    search_fields = ('name', 'author__username', 'author__email')
+    list_filter = ('tags',)
+    autocomplete_fields = ('author',)
+
+    def get_queryset(self, request):
+        favorites = Favorite.objects.filter(
+            recipe=OuterRef('pk')
+        ).order_by().values('recipe').annotate(count=Count('id'))
+        return super().get_queryset(request).annotate(
+            favorites_count=Coalesce(Subquery(favorites.values('count')), 0)
+        )
 
     def in_favorites(self, obj):
-        return obj.favorites.count()
-
-
-class IngredientAdmin(admin.ModelAdmin):
+        return obj.favorites_count
+    in_favorites.admin_order_field = 'favorites_count'
+
+    def save_related(self, request, form, formsets, change):
+        recipe_id = form.instance.id
+        old_ingredients = get_recipes_ingredients([recipe_id])[recipe_id]
+        old_delta = get_recipes_delta([recipe_id], sign=-1)
+        super().save_related(request, form, formsets, change)
+        update_ingredient_index(
+            recipe_id,
+            old_ingredients,
+            get_recipes_ingredients([recipe_id])[recipe_id]
+        )
+        update_tags_mask([recipe_id])
+        update_shopping_lists(recipe_id, old_delta)
+        refresh_cards([recipe_id])
+
+
+class RecipeLinkAdmin(LargeTableAdmin):
+    """
+    Describes base admin of recipe links (tags, ingredients),
+    which refreshes data of the changed recipes.
+    """
+
+    def get_snapshot(self, recipe_ids):
+        """Returns data of the recipes, which refresh compares to."""
+        return None
+
+    def refresh(self, recipe_ids, snapshot):
+        refresh_cards(recipe_ids)
+
+    def save_model(self, request, obj, form, change):
+        recipe_ids = {obj.recipe_id, form.initial.get('recipe', obj.recipe_id)}
+        snapshot = self.get_snapshot(recipe_ids)
+        super().save_model(request, obj, form, change)
+        self.refresh(recipe_ids, snapshot)
+
+    def delete_model(self, request, obj):
+        snapshot = self.get_snapshot([obj.recipe_id])
+        super().delete_model(request, obj)
+        self.refresh([obj.recipe_id], snapshot)
+
+    def delete_queryset(self, request, queryset):
+        recipe_ids = set(queryset.values_list('recipe_id', flat=True))
+        snapshot = self.get_snapshot(recipe_ids)
+        super().delete_queryset(request, queryset)
+        self.refresh(recipe_ids, snapshot)
+
+
+class IngredientAdmin(LargeTableAdmin):
     list_display = ('id', 'name', 'measurement_unit')
-    list_filter = ('name', )
     search_fields = ('name', )
 
 
-class IngredientInRecipeAdmin(admin.ModelAdmin):
+class IngredientInRecipeAdmin(RecipeLinkAdmin):
     list_display = ('id', 'ingredient', 'recipe', 'amount')
-
-
-class TagsInRecipeAdmin(admin.ModelAdmin):
+    list_select_related = ('ingredient', 'recipe')
+    search_fields = ('recipe__name', 'ingredient__name')
+    autocomplete_fields = ('ingredient', 'recipe')
+
+    def get_snapshot(self, recipe_ids):
+        return get_recipes_ingredients(recipe_ids)
+
+    def refresh(self, recipe_ids, snapshot):
+        new_ingredients = get_recipes_ingredients(recipe_ids)
+        for recipe_id in recipe_ids:
+            update_ingredient_index(
+                recipe_id, snapshot[recipe_id], new_ingredients[recipe_id]
+            )
+        rebuild_shopping_lists(ShoppingCart.objects.filter(
+            recipe_id__in=recipe_ids
+        ).values_list('user_id', flat=True).distinct())
+        super().refresh(recipe_ids, snapshot)
+
+
+class TagsInRecipeAdmin(RecipeLinkAdmin):
     list_display = ('id', 'tag', 'recipe')
+    list_select_related = ('tag', 'recipe')
+    list_filter = ('tag',)
+    search_fields = ('recipe__name',)
+    autocomplete_fields = ('recipe',)
+
+    def refresh(self, recipe_ids, snapshot):
+        update_tags_mask(recipe_ids)
+        super().refresh(recipe_ids, snapshot)
 
 
-class FavoriteAdmin(admin.ModelAdmin):
+class FavoriteAdmin(LargeTableAdmin):
     list_display = ('id', 'user', 'recipe', 'when_added')
-    search_fields = ('user', 'recipe')
+    list_select_related = ('user', 'recipe')
+    search_fields = ('user__email', 'user__username', 'recipe__name')
+    autocomplete_fields = ('user', 'recipe')
 
 
-class ShoppingCartAdmin(admin.ModelAdmin):
+class ShoppingCartAdmin(LargeTableAdmin):
+    """
+    Describes admin of shopping carts,
+    which rebuilds shopping lists of the changed users.
+    """
     list_display = ('id', 'user', 'recipe', 'when_added')
-    search_fields = ('user', 'recipe')
+    list_select_related = ('user', 'recipe')
+    search_fields = ('user__email', 'user__username', 'recipe__name')
+    autocomplete_fields = ('user', 'recipe')
+
+    def save_model(self, request, obj, form, change):
+        super().save_model(request, obj, form, change)
+        old_user_id = form.initial.get('user', obj.user_id)
+        rebuild_shopping_lists({obj.user_id, old_user_id})
+
+    def delete_model(self, request, obj):
+        super().delete_model(request, obj)
+        rebuild_shopping_lists([obj.user_id])
+
+    def delete_queryset(self, request, queryset):
+        user_ids = list(queryset.values_list('user_id', flat=True))
+        super().delete_queryset(request, queryset)
+        rebuild_shopping_lists(set(user_ids))
+
+
+class RequestProfileAdmin(admin.ModelAdmin):
+    """
+    Describes read-only admin of request profiles,
+    cProfile data is downloaded as .prof file
+    (opens with pstats, snakeviz etc.).
+    """
+    list_display = ('created', 'method', 'path', 'user', 'status_code',
+                    'duration', 'queries_count', 'download')
+    list_select_related = ('user',)
+    search_fields = ('path', 'user__email')
+    exclude = ('stats',)
+    readonly_fields = ('user', 'created', 'method', 'path', 'status_code',
+                       'duration', 'queries_count', 'queries_duration',
+                       'report', 'download')
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    def get_urls(self):
+        return [
+            path(
+                '<int:profile_id>/download/',
+                self.admin_site.admin_view(self.download_view),
+                name='recipes_requestprofile_download'
+            ),
+        ] + super().get_urls()
+
+    def download(self, obj):
+        return format_html('<a href="{}">.prof</a>', reverse(
+            'admin:recipes_requestprofile_download', args=[obj.id]
+        ))
+    download.short_description = 'Скачать'
+
+    def download_view(self, request, profile_id):
+        if not self.has_view_permission(request):
+            return HttpResponse(status=403)
+        request_profile = get_object_or_404(RequestProfile, id=profile_id)
+        response = HttpResponse(
+            bytes(request_profile.stats),
+            content_type='application/octet-stream'
+        )
+        response['Content-Disposition'] = (
+            f'attachment; filename="profile_{profile_id}.prof"'
+        )
+        return response
 
 
 admin.site.register(Tag, TagAdmin)
@@ -62,3 +237,4 @@ admin.site.register(IngredientInRecipe, IngredientInRecipeAdmin)
 admin.site.register(TagsInRecipe, TagsInRecipeAdmin)
 admin.site.register(Favorite, FavoriteAdmin)
 admin.site.register(ShoppingCart, ShoppingCartAdmin)
+admin.site.register(RequestProfile, RequestProfileAdmin)
@@ -0,0 +1,47 @@
+from django.db import models
+
+MAX_BITS = 63
+
+
+class BitmaskField(models.BigIntegerField):
+    """
+    Describes integer field storing a set of up to MAX_BITS bits
+    with has_any and has_all lookups:
+    field__has_any=mask is true if any bit of mask is set,
+    field__has_all=mask is true if all bits of mask are set.
+    """
+
+
+class HasAnyBits(models.Lookup):
+    lookup_name = 'has_any'
+
+    def as_sql(self, compiler, connection):
+        lhs, lhs_params = self.process_lhs(compiler, connection)
+        rhs, rhs_params = self.process_rhs(compiler, connection)
+        return f'({lhs} & {rhs}) <> 0', [*lhs_params, *rhs_params]
+
+
+class HasAllBits(models.Lookup):
+    lookup_name = 'has_all'
+
+    def as_sql(self, compiler, connection):
+        lhs, lhs_params = self.process_lhs(compiler, connection)
+        rhs, rhs_params = self.process_rhs(compiler, connection)
+        return (f'({lhs} & {rhs}) = {rhs}',
+                [*lhs_params, *rhs_params, *rhs_params])
+
+
+BitmaskField.register_lookup(HasAnyBits)
+BitmaskField.register_lookup(HasAllBits)
+
+
+def get_mask(bits):
+    mask = 0
+    for bit in bits:
+        mask |= 1 << bit
+    return mask
+
+
+def get_free_bit(used):
+    """Returns the lowest bit not in used, None if all bits are used."""
+    return next((bit for bit in range(MAX_BITS) if bit not in used), None)
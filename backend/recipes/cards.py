@@ -0,0 +1,103 @@
+import json
+
+from django.db import transaction
+
+from .models import IngredientInRecipe, Recipe, RecipeCard, TagsInRecipe
+
+BATCH_SIZE = 500
+
+
+def get_tags_map(recipe_ids):
+    """Returns {recipe_id: [tag, ...]} as TagSerializer shows them."""
+    tags = {}
+    rows = TagsInRecipe.objects.filter(
+        recipe_id__in=recipe_ids
+    ).values(
+        'recipe_id', 'tag__id', 'tag__name', 'tag__color', 'tag__slug'
+    ).order_by('tag_id')
+    for row in rows:
+        tags.setdefault(row['recipe_id'], []).append({
+            'id': row['tag__id'],
+            'name': row['tag__name'],
+            'color': row['tag__color'],
+            'slug': row['tag__slug'],
+        })
+    return tags
+
+
+def get_ingredients_map(recipe_ids):
+    """
+    Returns {recipe_id: [ingredient, ...]}
+    as IngredientInRecipeSerializer shows them.
+    """
+    ingredients = {}
+    rows = IngredientInRecipe.objects.filter(
+        recipe_id__in=recipe_ids
+    ).values(
+        'recipe_id', 'ingredient_id', 'ingredient__name',
+        'ingredient__measurement_unit', 'amount'
+    ).order_by('id')
+    for row in rows:
+        ingredients.setdefault(row['recipe_id'], []).append({
+            'id': row['ingredient_id'],
+            'name': row['ingredient__name'],
+            'measurement_unit': row['ingredient__measurement_unit'],
+            'amount': row['amount'],
+        })
+    return ingredients
+
+
+def build_cards(recipe_ids):
+    """
+    Returns {recipe_id: card JSON} with everything ShowRecipeSerializer
+    shows except per-user flags. Image is stored as file name,
+    because absolute URL depends on request.
+    """
+    tags = get_tags_map(recipe_ids)
+    ingredients = get_ingredients_map(recipe_ids)
+    rows = Recipe.objects.filter(id__in=recipe_ids).values(
+        'id', 'name', 'image', 'text', 'cooking_time', 'author_id',
+        'author__email', 'author__username', 'author__first_name',
+        'author__last_name'
+    ).order_by()
+    return {
+        row['id']: json.dumps({
+            'id': row['id'],
+            'tags': tags.get(row['id'], []),
+            'author': {
+                'email': row['author__email'],
+                'id': row['author_id'],
+                'username': row['author__username'],
+                'first_name': row['author__first_name'],
+                'last_name': row['author__last_name'],
+            },
+            'ingredients': ingredients.get(row['id'], []),
+            'name': row['name'],
+            'image': row['image'],
+            'text': row['text'],
+            'cooking_time': row['cooking_time'],
+        }, ensure_ascii=False)
+        for row in rows
+    }
+
+
+def refresh_cards(recipe_ids):
+    """Rebuilds and stores cards of the recipes, returns them."""
+    recipe_ids = list(recipe_ids)
+    cards = {}
+    for start in range(0, len(recipe_ids), BATCH_SIZE):
+        batch = recipe_ids[start:start + BATCH_SIZE]
+        built = build_cards(batch)
+        with transaction.atomic():
+            RecipeCard.objects.filter(recipe_id__in=batch).delete()
+            RecipeCard.objects.bulk_create([
+                RecipeCard(recipe_id=recipe_id, data=data)
+                for recipe_id, data in built.items()
+            ])
+        cards.update(built)
+    return cards
+
+
+def refresh_cards_on_commit(recipe_ids):
+    recipe_ids = list(recipe_ids)
+    transaction.on_commit(lambda: refresh_cards(recipe_ids))
@@ -0,0 +1,45 @@
+from django.conf import settings
+from django.core.cache import cache
+
+from foodgram import metrics
+
+from .fast_serializers import serialize_ingredients, serialize_tags
+from .models import Ingredient, Tag
+
+TAGS_KEY = 'catalogue_tags'
+INGREDIENTS_KEY = 'catalogue_ingredients'
+HIT_METRICS = {
+    True: 'foodgram_cache_hits_total',
+    False: 'foodgram_cache_misses_total',
+}
+
+
+def get_tags():
+    """Returns the list of all tags, cached for CATALOGUE_CACHE_TIMEOUT."""
+    tags = cache.get(TAGS_KEY)
+    metrics.inc(HIT_METRICS[tags is not None], cache='catalogue_tags')
+    if tags is None:
+        tags = serialize_tags(Tag.objects.all())
+        cache.set(TAGS_KEY, tags, settings.CATALOGUE_CACHE_TIMEOUT)
+    return tags
+
+
+def get_ingredients():
+    """
+    Returns the list of all ingredients,
+    cached for CATALOGUE_CACHE_TIMEOUT.
+    """
+    ingredients = cache.get(INGREDIENTS_KEY)
+    metrics.inc(
+        HIT_METRICS[ingredients is not None], cache='catalogue_ingredients'
+    )
+    if ingredients is None:
+        ingredients = serialize_ingredients(Ingredient.objects.all())
+        cache.set(
+            INGREDIENTS_KEY, ingredients, settings.CATALOGUE_CACHE_TIMEOUT
+        )
+    return ingredients
+
+
+def invalidate_catalogue():
+    cache.delete_many([TAGS_KEY, INGREDIENTS_KEY])
@@ -0,0 +1,146 @@
+import logging
+import threading
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from rest_framework import status
+from rest_framework.exceptions import APIException
+
+from foodgram import metrics
+
+logger = logging.getLogger(__name__)
+
+
+class Saturated(APIException):
+    status_code = status.HTTP_503_SERVICE_UNAVAILABLE
+    default_detail = 'Сервер перегружен, повторите запрос позже.'
+    default_code = 'saturated'
+
+    def __init__(self, wait):
+        super().__init__()
+        # exception_handler of DRF sends it as Retry-After header
+        self.wait = wait
+
+
+class ConcurrencyLimiter:
+    """
+    Describes a semaphore limiting the number of requests of one scope
+    that are processed at the same time.
+    Threads of one process wait on a local semaphore, processes share
+    `limit` slots in the cache, taken with atomic cache.add. A slot
+    expires after CONCURRENCY_LEASE seconds, so slots of a killed
+    worker are freed. Limits hold across workers only if the cache
+    backend is shared by them.
+    """
+    cache_format = 'concurrency_%(scope)s_%(slot)s'
+    poll_interval = 0.05
+
+    def __init__(self, scope, limit, timeout):
+        self.scope = scope
+        self.limit = limit
+        self.timeout = timeout
+        self.local = threading.BoundedSemaphore(limit)
+        self.lock = threading.Lock()
+        self.active = 0
+        self.rejected = 0
+
+    def get_slot_key(self, slot):
+        return self.cache_format % {'scope': self.scope, 'slot': slot}
+
+    def acquire(self):
+        """Returns the taken slot or raises Saturated."""
+        deadline = time.monotonic() + self.timeout
+        if self.local.acquire(timeout=self.timeout):
+            while True:
+                for slot in range(self.limit):
+                    if cache.add(self.get_slot_key(slot), 1,
+                                 settings.CONCURRENCY_LEASE):
+                        with self.lock:
+                            self.active += 1
+                        return slot
+                if time.monotonic() >= deadline:
+                    break
+                time.sleep(self.poll_interval)
+            self.local.release()
+        with self.lock:
+            self.rejected += 1
+        metrics.inc('foodgram_concurrency_rejected_total', scope=self.scope)
+        logger.warning('%s is saturated: %s', self.scope, self.saturation())
+        raise Saturated(settings.CONCURRENCY_RETRY_AFTER)
+
+    def release(self, slot):
+        cache.delete(self.get_slot_key(slot))
+        with self.lock:
+            self.active -= 1
+        self.local.release()
+
+    def saturation(self):
+        """
+        Returns {'limit', 'active', 'busy', 'rejected'}, where active
+        is counted in this process and busy in all processes.
+        """
+        busy = cache.get_many(
+            [self.get_slot_key(slot) for slot in range(self.limit)]
+        )
+        return {
+            'limit': self.limit,
+            'active': self.active,
+            'busy': len(busy),
+            'rejected': self.rejected,
+        }
+
+
+_limiters = {}
+_limiters_lock = threading.Lock()
+
+
+def get_limiter(scope):
+    """Returns the limiter of the scope from CONCURRENCY_LIMITS."""
+    with _limiters_lock:
+        if scope not in _limiters:
+            _limiters[scope] = ConcurrencyLimiter(
+                scope, **settings.CONCURRENCY_LIMITS[scope]
+            )
+        return _limiters[scope]
+
+
+@metrics.register_gauges
+def collect_saturation():
+    """Returns busy slots of every scope, counted in all processes."""
+    gauges = []
+    for scope in settings.CONCURRENCY_LIMITS:
+        saturation = get_limiter(scope).saturation()
+        gauges.append(('foodgram_concurrency_busy', {'scope': scope},
+                       saturation['busy']))
+        gauges.append(('foodgram_concurrency_limit', {'scope': scope},
+                       saturation['limit']))
+    return gauges
+
+
+class ConcurrencyLimitMixin:
+    """
+    Describes a mixin for APIView limiting concurrent requests.
+    The scope is returned by get_concurrency_scope, None means no limit.
+    The slot is taken after authentication, permission and throttling
+    checks and released when the response is finalized.
+    """
+    concurrency_scope = None
+
+    def get_concurrency_scope(self):
+        return self.concurrency_scope
+
+    def initial(self, request, *args, **kwargs):
+        super().initial(request, *args, **kwargs)
+        scope = self.get_concurrency_scope()
+        if scope is not None:
+            limiter = get_limiter(scope)
+            self.concurrency_slot = (limiter, limiter.acquire())
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        slot = getattr(self, 'concurrency_slot', None)
+        if slot is not None:
+            self.concurrency_slot = None
+            limiter, number = slot
+            limiter.release(number)
+        return super().finalize_response(request, response, *args, **kwargs)
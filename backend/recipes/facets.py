@@ -0,0 +1,112 @@
+import hashlib
+import json
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Count, Q
+from django_filters.utils import translate_validation
+
+from foodgram import metrics
+
+from .catalogue import HIT_METRICS
+from .filters import RecipeFilter
+from .models import Recipe, Tag
+
+FACETS_KEY = 'recipe_facets_%s'
+COOKING_TIME_BUCKETS = ((None, 15), (15, 30), (30, 60), (60, None))
+TAG_PARAMS = ('tags', 'tags_match')
+IGNORED_PARAMS = ('page', 'limit', 'fields', 'expand', 'profile')
+USER_PARAMS = ('is_favorited', 'is_in_shopping_cart')
+
+
+def get_facets_key(request):
+    """
+    Returns cache key of the filter: parameters are sorted,
+    pagination and representation parameters are ignored,
+    user is a part of the key only for user-dependent filters.
+    """
+    params = sorted(
+        (name, sorted(request.query_params.getlist(name)))
+        for name in request.query_params if name not in IGNORED_PARAMS
+    )
+    user_id = None
+    if any(name in USER_PARAMS for name, _ in params):
+        user_id = request.user.pk
+    key = json.dumps([user_id, params], ensure_ascii=False)
+    return FACETS_KEY % hashlib.md5(key.encode()).hexdigest()
+
+
+def get_bucket_lookup(low, high):
+    lookup = Q()
+    if low is not None:
+        lookup &= Q(cooking_time__gte=low)
+    if high is not None:
+        lookup &= Q(cooking_time__lt=high)
+    return lookup
+
+
+def and_lookups(*lookups):
+    """Returns Q of non-empty lookups or None for Count(filter=...)."""
+    lookups = [lookup for lookup in lookups if lookup]
+    if not lookups:
+        return None
+    combined = lookups[0]
+    for lookup in lookups[1:]:
+        combined &= lookup
+    return combined
+
+
+def count_facets(request):
+    """
+    Counts recipes matching the filters of the request in one query:
+    the total and per cooking time bucket with all filters,
+    per tag with all filters but tags, so every tag shows
+    how many recipes it would add.
+    """
+    filterset = RecipeFilter(
+        request.query_params, queryset=Recipe.objects.all(), request=request
+    )
+    if not filterset.is_valid():
+        raise translate_validation(filterset.errors)
+    data = request.query_params.copy()
+    for name in TAG_PARAMS:
+        data.pop(name, None)
+    queryset = RecipeFilter(
+        data, queryset=Recipe.objects.all(), request=request
+    ).qs
+    tags = filterset.form.cleaned_data.get('tags')
+    tags_lookup = filterset.get_tags_lookup(tags) if tags else None
+
+    all_tags = list(Tag.objects.values_list('slug', 'bit'))
+    aggregates = {'total': Count('id', filter=tags_lookup)}
+    for number, (_, bit) in enumerate(all_tags):
+        aggregates[f'tag_{number}'] = Count(
+            'id', filter=Q(tags_mask__has_any=1 << bit)
+        )
+    for number, (low, high) in enumerate(COOKING_TIME_BUCKETS):
+        aggregates[f'time_{number}'] = Count('id', filter=and_lookups(
+            tags_lookup, get_bucket_lookup(low, high)
+        ))
+    counts = queryset.order_by().aggregate(**aggregates)
+    return {
+        'count': counts['total'],
+        'tags': [
+            {'slug': slug, 'count': counts[f'tag_{number}']}
+            for number, (slug, _) in enumerate(all_tags)
+        ],
+        'cooking_time': [
+            {'min': low, 'max': high, 'count': counts[f'time_{number}']}
+            for number, (low, high) in enumerate(COOKING_TIME_BUCKETS)
+        ],
+    }
+
+
+def get_facets(request):
+    """Returns count_facets cached for FACETS_CACHE_TIMEOUT."""
+    key = get_facets_key(request)
+    facets = cache.get(key)
+    metrics.inc(HIT_METRICS[facets is not None], cache='recipe_facets')
+    if facets is None:
+        facets = count_facets(request)
+        cache.set(key, facets, settings.FACETS_CACHE_TIMEOUT)
+    return facets
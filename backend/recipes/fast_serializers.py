@@ -0,0 +1,135 @@
+"""
+Read-only fast serialization path for hot list endpoints.
+Builds plain dicts from .values() rows and stored recipe cards
+instead of model instances, related data is fetched
+by one query per relation for the whole page.
+Output is the same as of the serializers, which are named
+in the docstrings, field by field and in the same order.
+"""
+import json
+
+from django.conf import settings
+from django.db.models import Count, OuterRef, Subquery
+from django.utils.encoding import filepath_to_uri
+
+from users.models import Follow
+
+from .cards import refresh_cards
+from .models import Recipe
+from .serializers import IngredientSerializer, TagSerializer
+
+RECIPE_VALUES = ('id', 'author_id', 'card__data')
+SUBSCRIPTION_VALUES = ('id', 'email', 'username', 'first_name', 'last_name')
+
+
+def get_media_prefix(request):
+    """Returns absolute URL of media, as ImageField would build it."""
+    return request.build_absolute_uri(settings.MEDIA_URL)
+
+
+def get_image_url(media_prefix, name):
+    if not name:
+        return None
+    return media_prefix + filepath_to_uri(name)
+
+
+def get_subscribed(request, author_ids):
+    """Returns ids of the authors, request user is subscribed to."""
+    if request.user.is_anonymous:
+        return set()
+    return set(Follow.objects.filter(
+        user=request.user, author_id__in=author_ids
+    ).values_list('author_id', flat=True))
+
+
+def serialize_tags(queryset):
+    """Same as TagSerializer(queryset, many=True).data"""
+    return list(queryset.values(*TagSerializer.Meta.fields))
+
+
+def serialize_ingredients(queryset):
+    """Same as IngredientSerializer(queryset, many=True).data"""
+    return list(queryset.values(*IngredientSerializer.Meta.fields))
+
+
+def serialize_recipes(rows, request):
+    """
+    Same as ShowRecipeSerializer(recipes, many=True).data
+    for rows of queryset.values(*RECIPE_VALUES),
+    optionally annotated with favorited and in_shopping_cart flags.
+    Recipes are assembled from stored cards (see recipes/cards.py),
+    missing cards are built and stored on the fly.
+    """
+    cards = {row['id']: row['card__data'] for row in rows}
+    missing = [recipe_id for recipe_id, card in cards.items() if not card]
+    if missing:
+        cards.update(refresh_cards(missing))
+    subscribed = get_subscribed(request, {row['author_id'] for row in rows})
+    media_prefix = get_media_prefix(request)
+    data = []
+    for row in rows:
+        card = json.loads(cards[row['id']])
+        data.append({
+            'id': card['id'],
+            'tags': card['tags'],
+            'author': {
+                **card['author'],
+                'is_subscribed': row['author_id'] in subscribed,
+            },
+            'ingredients': card['ingredients'],
+            'is_favorited': row.get('favorited', False),
+            'is_in_shopping_cart': row.get('in_shopping_cart', False),
+            'name': card['name'],
+            'image': get_image_url(media_prefix, card['image']),
+            'text': card['text'],
+            'cooking_time': card['cooking_time'],
+        })
+    return data
+
+
+def annotate_subscriptions(queryset):
+    """Adds recipes_count to the queryset of followed authors."""
+    return queryset.values(*SUBSCRIPTION_VALUES).annotate(
+        recipes_count=Count('recipes', distinct=True)
+    )
+
+
+def serialize_subscriptions(rows, request):
+    """
+    Same as ShowFollowSerializer(authors, many=True).data
+    for rows of annotate_subscriptions(queryset).
+    """
+    author_ids = [row['id'] for row in rows]
+    latest = Recipe.objects.filter(
+        author_id=OuterRef('author_id')
+    ).order_by('-pub_date').values('id')[:settings.RECIPES_LIMIT]
+    recipes = {}
+    recipe_rows = Recipe.objects.filter(
+        author_id__in=author_ids, id__in=Subquery(latest)
+    ).values('author_id', 'id', 'name', 'image', 'cooking_time')
+    media_prefix = get_media_prefix(request)
+    for row in recipe_rows.order_by('-pub_date'):
+        recipes.setdefault(row['author_id'], []).append({
+            'id': row['id'],
+            'name': row['name'],
+            'image': get_image_url(media_prefix, row['image']),
+            'cooking_time': row['cooking_time'],
+        })
+    following_user = set()
+    if request.user.is_authenticated:
+        following_user = set(Follow.objects.filter(
+            user_id__in=author_ids, author=request.user
+        ).values_list('user_id', flat=True))
+    return [
+        {
+            'email': row['email'],
+            'id': row['id'],
+            'username': row['username'],
+            'first_name': row['first_name'],
+            'last_name': row['last_name'],
+            'is_subscribed': row['id'] in following_user,
+            'recipes': recipes.get(row['id'], []),
+            'recipes_count': row['recipes_count'],
+        }
+        for row in rows
+    ]
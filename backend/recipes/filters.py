@@ -1,32 +1,71 @@
+from django.db.models import Q
 from django_filters import rest_framework as filters
 
-from .models import Recipe, Ingredient
+from .models import Ingredient, Recipe, Tag
+from .search import search_recipes
+from .tag_mask import get_tags_mask
 
 
 class RecipeFilter(filters.FilterSet):
-    tags = filters.AllValuesMultipleFilter(
-        field_name='tagsinrecipe__tag__slug'
+    ANY = 'any'
+    ALL = 'all'
+    TAGS_MATCH_CHOICES = ((ANY, 'Любой из тегов'), (ALL, 'Все теги'))
+
+    tags = filters.ModelMultipleChoiceFilter(
+        queryset=Tag.objects.all(),
+        to_field_name='slug',
+        method='get_tags'
+    )
+    tags_match = filters.ChoiceFilter(
+        choices=TAGS_MATCH_CHOICES,
+        method='get_tags_match'
     )
     is_favorited = filters.BooleanFilter(method='get_favorite')
     is_in_shopping_cart = filters.BooleanFilter(
         method='get_is_in_shopping_cart'
     )
+    search = filters.CharFilter(method='get_search')
 
     class Meta:
         model = Recipe
-        fields = ('is_favorited', 'is_in_shopping_cart', 'author', 'tags')
+        fields = ('is_favorited', 'is_in_shopping_cart', 'author', 'tags',
+                  'tags_match', 'search')
+
+    def get_tags(self, queryset, name, value):
+        """
+        Filters by Recipe.tags_mask without joins: recipes with any
+        of the tags by default, with all of them if tags_match=all.
+        """
+        if not value:
+            return queryset
+        return queryset.filter(self.get_tags_lookup(value))
+
+    def get_tags_lookup(self, tags):
+        mask = get_tags_mask(tags)
+        if self.form.cleaned_data.get('tags_match') == self.ALL:
+            return Q(tags_mask__has_all=mask)
+        return Q(tags_mask__has_any=mask)
+
+    def get_tags_match(self, queryset, name, value):
+        """Only changes the way tags are matched (see get_tags)."""
+        return queryset
 
     def get_favorite(self, queryset, name, value):
         user = self.request.user
         if value:
-            return Recipe.objects.filter(favorites__user=user)
-        return Recipe.objects.all()
+            return queryset.filter(favorites__user=user)
+        return queryset
 
     def get_is_in_shopping_cart(self, queryset, name, value):
         user = self.request.user
         if value:
-            return Recipe.objects.filter(shopping_cart__user=user)
-        return Recipe.objects.all()
+            return queryset.filter(shopping_cart__user=user)
+        return queryset
+
+    def get_search(self, queryset, name, value):
+        if not value.strip():
+            return queryset
+        return search_recipes(queryset, value)
 
 
 class IngredientFilter(filters.FilterSet):
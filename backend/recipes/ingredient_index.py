@@ -0,0 +1,261 @@
+import heapq
+import sys
+import zlib
+from array import array
+from bisect import bisect_left
+from collections import Counter
+from itertools import accumulate
+
+from django.db import transaction
+from django.db.models import Max
+
+from .models import IngredientIndex, IngredientInRecipe
+
+# postings are split into chunks of consecutive recipe ids, a write
+# locks and rewrites only the chunk of its recipe
+CHUNK_SPAN = 4096
+# ids are stored as deltas, which are less than CHUNK_SPAN
+ID_TYPE = 'H'
+SIZE_TYPE = 'H'
+
+
+def get_chunk(recipe_id):
+    return recipe_id // CHUNK_SPAN
+
+
+def encode_postings(recipe_ids, sizes, chunk):
+    """
+    Encodes sorted recipe ids of the chunk and ingredients count
+    of those recipes: ids are delta-encoded from the chunk start,
+    then both arrays are compressed by zlib.
+    """
+    deltas = array(ID_TYPE, [
+        current - previous for previous, current in zip(
+            [chunk * CHUNK_SPAN, *recipe_ids[:-1]], recipe_ids
+        )
+    ])
+    sizes = array(SIZE_TYPE, sizes)
+    if sys.byteorder == 'big':
+        deltas.byteswap()
+        sizes.byteswap()
+    return zlib.compress(deltas.tobytes() + sizes.tobytes())
+
+
+def decode_postings(data, chunk):
+    deltas, sizes = array(ID_TYPE), array(SIZE_TYPE)
+    if data:
+        raw = zlib.decompress(data)
+        length = len(raw) // (deltas.itemsize + sizes.itemsize)
+        deltas.frombytes(raw[:length * deltas.itemsize])
+        sizes.frombytes(raw[length * deltas.itemsize:])
+        if sys.byteorder == 'big':
+            deltas.byteswap()
+            sizes.byteswap()
+    recipe_ids = array('I', accumulate(deltas, initial=chunk * CHUNK_SPAN))
+    return recipe_ids[1:], sizes
+
+
+def get_recipes_ingredients(recipe_ids):
+    """Returns {recipe_id: {ingredient_id, ...}} of the recipes."""
+    ingredients = {recipe_id: set() for recipe_id in recipe_ids}
+    rows = IngredientInRecipe.objects.filter(
+        recipe_id__in=recipe_ids
+    ).values_list('recipe_id', 'ingredient_id').order_by()
+    for recipe_id, ingredient_id in rows:
+        ingredients[recipe_id].add(ingredient_id)
+    return ingredients
+
+
+def update_ingredient_index(recipe_id, old_ingredients, new_ingredients):
+    """
+    Incrementally updates index after recipe create, update or delete:
+    removes recipe from postings of its old ingredients
+    and adds it with new ingredients count to postings of new ones.
+    Only chunks of the recipe are locked, so concurrent writes
+    don't lose updates and wait only for a short rewrite of a chunk.
+    """
+    old_ingredients, new_ingredients = set(old_ingredients), set(
+        new_ingredients
+    )
+    affected = sorted(old_ingredients | new_ingredients)
+    if not affected:
+        return
+    size = len(new_ingredients)
+    chunk = get_chunk(recipe_id)
+    with transaction.atomic():
+        IngredientIndex.objects.bulk_create(
+            [IngredientIndex(ingredient_id=pk, chunk=chunk)
+             for pk in new_ingredients],
+            ignore_conflicts=True
+        )
+        rows = IngredientIndex.objects.select_for_update().filter(
+            ingredient_id__in=affected, chunk=chunk
+        ).order_by('ingredient_id')
+        changed, empty = [], []
+        for row in rows:
+            recipe_ids, sizes = decode_postings(row.recipes, chunk)
+            position = bisect_left(recipe_ids, recipe_id)
+            if (position < len(recipe_ids)
+                    and recipe_ids[position] == recipe_id):
+                del recipe_ids[position]
+                del sizes[position]
+            if row.ingredient_id in new_ingredients:
+                recipe_ids.insert(position, recipe_id)
+                sizes.insert(position, size)
+            if recipe_ids:
+                row.recipes = encode_postings(recipe_ids, sizes, chunk)
+                changed.append(row)
+            else:
+                empty.append(row.id)
+        IngredientIndex.objects.bulk_update(changed, ['recipes'])
+        IngredientIndex.objects.filter(id__in=empty).delete()
+
+
+def add_to_ingredient_index(recipes_ingredients):
+    """
+    Adds new recipes {recipe_id: ingredient ids} to the index
+    with one locking read and one update per chunk,
+    used by bulk writes instead of update_ingredient_index.
+    """
+    chunks = {}
+    for recipe_id, ingredients in recipes_ingredients.items():
+        if ingredients:
+            chunks.setdefault(get_chunk(recipe_id), {})[recipe_id] = set(
+                ingredients
+            )
+    with transaction.atomic():
+        for chunk, recipes in sorted(chunks.items()):
+            postings = {}
+            for recipe_id, ingredients in recipes.items():
+                for ingredient_id in ingredients:
+                    postings.setdefault(ingredient_id, []).append(recipe_id)
+            IngredientIndex.objects.bulk_create(
+                [IngredientIndex(ingredient_id=pk, chunk=chunk)
+                 for pk in postings],
+                ignore_conflicts=True
+            )
+            rows = IngredientIndex.objects.select_for_update().filter(
+                ingredient_id__in=postings, chunk=chunk
+            ).order_by('ingredient_id')
+            for row in rows:
+                sizes = dict(zip(*decode_postings(row.recipes, chunk)))
+                sizes.update(
+                    (recipe_id, len(recipes[recipe_id]))
+                    for recipe_id in postings[row.ingredient_id]
+                )
+                recipe_ids = sorted(sizes)
+                row.recipes = encode_postings(
+                    recipe_ids,
+                    [sizes[recipe_id] for recipe_id in recipe_ids],
+                    chunk
+                )
+            IngredientIndex.objects.bulk_update(
+                rows, ['recipes'], batch_size=250
+            )
+
+
+def get_chunk_rows(links):
+    """
+    Returns {ingredient_id: encoded postings} of one chunk
+    from sorted distinct (ingredient_id, recipe_id) of its recipes.
+    """
+    sizes = Counter(recipe_id for _, recipe_id in links)
+    postings = {}
+    for ingredient_id, recipe_id in links:
+        postings.setdefault(ingredient_id, []).append(recipe_id)
+    return {
+        ingredient_id: encode_postings(
+            recipe_ids,
+            [sizes[recipe_id] for recipe_id in recipe_ids],
+            get_chunk(recipe_ids[0])
+        )
+        for ingredient_id, recipe_ids in postings.items()
+    }
+
+
+def rebuild_ingredient_index(index_model=IngredientIndex,
+                             link_model=IngredientInRecipe):
+    """
+    Rebuilds the whole index from IngredientInRecipe chunk by chunk,
+    so only links of one chunk are held in memory.
+    Models are passed by the migration, which fills the index.
+    Returns the number of written chunks.
+    """
+    last_id = link_model.objects.aggregate(last=Max('recipe_id'))['last']
+    index_model.objects.filter(
+        chunk__gt=get_chunk(last_id or 0)
+    ).delete()
+    count = 0
+    for chunk in range(get_chunk(last_id or 0) + 1):
+        links = list(link_model.objects.filter(
+            recipe_id__gte=chunk * CHUNK_SPAN,
+            recipe_id__lt=(chunk + 1) * CHUNK_SPAN
+        ).values_list('ingredient_id', 'recipe_id').distinct().order_by(
+            'ingredient_id', 'recipe_id'
+        ))
+        rows = get_chunk_rows(links)
+        with transaction.atomic():
+            index_model.objects.filter(chunk=chunk).delete()
+            index_model.objects.bulk_create(
+                [
+                    index_model(ingredient_id=ingredient_id, chunk=chunk,
+                                recipes=data)
+                    for ingredient_id, data in rows.items()
+                ],
+                batch_size=250
+            )
+        count += len(rows)
+    return count
+
+
+def get_relevance(item):
+    recipe_id, matched, missing = item
+    return -matched, missing, -recipe_id
+
+
+class FoundRecipes:
+    """
+    Describes found (recipe_id, matched, missing) in relevance order
+    for the paginator: only the requested slice is selected
+    with a heap instead of sorting all candidates.
+    """
+
+    def __init__(self, found):
+        self.found = found
+
+    def __len__(self):
+        return len(self.found)
+
+    def __getitem__(self, index):
+        if not isinstance(index, slice):
+            return list(self)[index]
+        start, stop, step = index.indices(len(self.found))
+        return heapq.nsmallest(
+            stop, self.found, key=get_relevance
+        )[start:stop:step]
+
+    def __iter__(self):
+        return iter(sorted(self.found, key=get_relevance))
+
+
+def find_recipes(ingredients, max_missing):
+    """
+    Returns (recipe_id, matched, missing) for recipes,
+    which contain at least one of the ingredients and lack
+    no more than max_missing others.
+    Recipes with more matched and less missing ingredients go first.
+    """
+    matched = Counter()
+    sizes = {}
+    postings = IngredientIndex.objects.filter(
+        ingredient_id__in=set(ingredients)
+    ).values_list('chunk', 'recipes')
+    for chunk, data in postings:
+        recipe_ids, recipe_sizes = decode_postings(data, chunk)
+        matched.update(recipe_ids)
+        sizes.update(zip(recipe_ids, recipe_sizes))
+    return FoundRecipes([
+        (recipe_id, count, sizes[recipe_id] - count)
+        for recipe_id, count in matched.items()
+        if sizes[recipe_id] - count <= max_missing
+    ])
@@ -0,0 +1,52 @@
+import time
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.test.utils import override_settings
+from rest_framework.test import APIClient
+
+User = get_user_model()
+
+ENDPOINTS = (
+    '/api/recipes/',
+    '/api/users/subscriptions/',
+    '/api/tags/',
+    '/api/ingredients/',
+)
+
+
+class Command(BaseCommand):
+    help = ('Compares speed of fast serialization path and serializers, '
+            'parity of their output is checked by '
+            'recipes/tests/test_fast_serializers.py')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--user', help='Email of the user to make requests as'
+        )
+        parser.add_argument('--iterations', type=int, default=20)
+
+    def handle(self, *args, **options):
+        client = APIClient()
+        if options['user']:
+            try:
+                user = User.objects.get(email=options['user'])
+            except User.DoesNotExist:
+                raise CommandError(f'User {options["user"]} not found')
+            client.force_authenticate(user)
+        for url in ENDPOINTS:
+            timings = {}
+            for fast in (False, True):
+                with override_settings(FAST_SERIALIZATION=fast):
+                    start = time.perf_counter()
+                    for _ in range(options['iterations']):
+                        response = client.get(url)
+                    timings[fast] = (
+                        (time.perf_counter() - start) / options['iterations']
+                    )
+            self.stdout.write(
+                f'{url}: status {response.status_code}, '
+                f'serializers {timings[False] * 1000:.1f} ms, '
+                f'fast {timings[True] * 1000:.1f} ms, '
+                f'x{timings[False] / timings[True]:.1f}'
+            )
@@ -0,0 +1,71 @@
+import subprocess
+import sys
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+STARTUP_CODE = (
+    'import django; django.setup(); '
+    'import foodgram.wsgi, foodgram.urls'
+)
+
+
+class Command(BaseCommand):
+    help = ('Profiles imports of the app startup with python -X importtime '
+            'and fails if it imports any of the forbidden modules')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--forbid', nargs='+', default=['reportlab'],
+            help='Top-level modules which must not be imported on startup'
+        )
+        parser.add_argument(
+            '--top', type=int, default=10,
+            help='Number of the slowest imports to show'
+        )
+
+    def handle(self, *args, **options):
+        result = subprocess.run(
+            [sys.executable, '-X', 'importtime', '-c', STARTUP_CODE],
+            stderr=subprocess.PIPE, universal_newlines=True,
+            cwd=settings.BASE_DIR
+        )
+        if result.returncode:
+            raise CommandError('\n'.join(
+                line for line in result.stderr.splitlines()
+                if not line.startswith('import time:')
+            ))
+        imports = self.parse(result.stderr)
+        total = sum(own for own, _ in imports.values())
+        self.stdout.write(
+            f'Startup imports {len(imports)} modules in {total / 1000:.0f} ms'
+        )
+        slowest = sorted(
+            imports.items(), key=lambda item: item[1][1], reverse=True
+        )
+        for module, (_, cumulative) in slowest[:options['top']]:
+            self.stdout.write(f'{cumulative / 1000:8.1f} ms  {module}')
+        forbidden = sorted(
+            {module.split('.')[0] for module in imports}
+            & set(options['forbid'])
+        )
+        if forbidden:
+            raise CommandError(
+                'Startup imports forbidden modules: ' + ', '.join(forbidden)
+            )
+        self.stdout.write(self.style.SUCCESS('No forbidden modules imported'))
+
+    def parse(self, output):
+        """
+        Returns {module: (self_us, cumulative_us)} from lines like
+        'import time:       123 |        456 |   package.module'.
+        """
+        imports = {}
+        for line in output.splitlines():
+            if not line.startswith('import time:'):
+                continue
+            own, cumulative, module = line[len('import time:'):].split('|')
+            if not own.strip().isdigit():
+                continue
+            imports[module.strip()] = (int(own), int(cumulative))
+        return imports
@@ -0,0 +1,43 @@
+from django.core.management.base import BaseCommand
+
+from recipes.similarity import compute_similar_recipes
+
+
+class Command(BaseCommand):
+    help = 'Precomputes top-K similar recipes by ingredients and tags'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--top', type=int, default=10,
+            help='Number of similar recipes to store for each recipe'
+        )
+        parser.add_argument(
+            '--max-df', type=float, default=0.02,
+            help='Ignore ingredients present in larger share of recipes '
+                 'when looking for candidates'
+        )
+        parser.add_argument(
+            '--min-df', type=int, default=100,
+            help='Never ignore ingredients present in fewer recipes'
+        )
+        parser.add_argument(
+            '--candidates', type=int, default=200,
+            help='Number of candidates to score exactly for each recipe'
+        )
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        count = compute_similar_recipes(
+            top=options['top'],
+            max_df=options['max_df'],
+            min_df=options['min_df'],
+            candidates=options['candidates'],
+            batch_size=options['batch_size'],
+            progress=self.report_progress,
+        )
+        self.stdout.write(
+            self.style.SUCCESS(f'Processed {count} recipes')
+        )
+
+    def report_progress(self, done, total):
+        self.stdout.write(f'{done}/{total}')
@@ -0,0 +1,73 @@
+import json
+import os
+
+from django.core.files.storage import default_storage
+from django.core.management.base import BaseCommand
+
+from recipes.cards import get_ingredients_map, get_tags_map
+from recipes.models import Recipe
+
+
+class Command(BaseCommand):
+    help = ('Exports recipes to <path>/recipes.jsonl, '
+            'images are copied to <path>/images/')
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='Directory to export to')
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        path = options['path']
+        os.makedirs(os.path.join(path, 'images'), exist_ok=True)
+        recipes = Recipe.objects.order_by('id').values(
+            'id', 'name', 'text', 'cooking_time', 'image', 'pub_date',
+            'author__email'
+        )
+        count = 0
+        with open(os.path.join(path, 'recipes.jsonl'), 'w',
+                  encoding='utf-8') as output:
+            batch = []
+            for recipe in recipes.iterator(chunk_size=options['batch_size']):
+                batch.append(recipe)
+                if len(batch) == options['batch_size']:
+                    count += self.export_batch(batch, path, output)
+                    batch = []
+                    self.stdout.write(f'Exported {count} recipes')
+            count += self.export_batch(batch, path, output)
+        self.stdout.write(self.style.SUCCESS(f'Exported {count} recipes'))
+
+    def export_batch(self, batch, path, output):
+        recipe_ids = [recipe['id'] for recipe in batch]
+        tags = get_tags_map(recipe_ids)
+        ingredients = get_ingredients_map(recipe_ids)
+        for recipe in batch:
+            image = self.export_image(recipe['image'], path)
+            output.write(json.dumps({
+                'name': recipe['name'],
+                'text': recipe['text'],
+                'cooking_time': recipe['cooking_time'],
+                'author': recipe['author__email'],
+                'pub_date': recipe['pub_date'].isoformat(),
+                'image': image,
+                'tags': [tag['slug'] for tag in tags.get(recipe['id'], [])],
+                'ingredients': [
+                    {
+                        'name': ingredient['name'],
+                        'measurement_unit': ingredient['measurement_unit'],
+                        'amount': ingredient['amount'],
+                    }
+                    for ingredient in ingredients.get(recipe['id'], [])
+                ],
+            }, ensure_ascii=False) + '\n')
+        return len(batch)
+
+    def export_image(self, name, path):
+        if not name or not default_storage.exists(name):
+            return None
+        relative_path = os.path.join('images', os.path.basename(name))
+        with default_storage.open(name) as source, open(
+            os.path.join(path, relative_path), 'wb'
+        ) as destination:
+            for chunk in source.chunks():
+                destination.write(chunk)
+        return relative_path
@@ -0,0 +1,192 @@
+import json
+import os
+
+from django.contrib.auth import get_user_model
+from django.core.files import File
+from django.core.files.storage import default_storage
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.utils.dateparse import parse_datetime
+
+from recipes.bitmask import get_mask
+from recipes.cards import refresh_cards
+from recipes.catalogue import invalidate_catalogue
+from recipes.ingredient_index import add_to_ingredient_index
+from recipes.models import (Ingredient, IngredientInRecipe, Recipe, Tag,
+                            TagsInRecipe)
+from recipes.timeline import fan_out_recipes
+
+User = get_user_model()
+
+
+class Command(BaseCommand):
+    help = ('Imports recipes from <path>/recipes.jsonl made by '
+            'export_recipes, images are taken from <path>/images/')
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='Directory to import from')
+        parser.add_argument('--batch-size', type=int, default=1000)
+        parser.add_argument(
+            '--author',
+            help='Email of the author for recipes with unknown author'
+        )
+
+    def handle(self, *args, **options):
+        self.path = options['path']
+        self.default_author = None
+        if options['author']:
+            self.default_author = User.objects.filter(
+                email=options['author']
+            ).values_list('id', flat=True).first()
+            if self.default_author is None:
+                raise CommandError(f'User {options["author"]} not found')
+        self.tags = {slug: (pk, bit) for slug, pk, bit in
+                     Tag.objects.values_list('slug', 'id', 'bit')}
+        self.ingredients = {
+            (name, unit): pk for pk, name, unit in
+            Ingredient.objects.values_list('id', 'name', 'measurement_unit')
+        }
+        count = 0
+        with open(os.path.join(self.path, 'recipes.jsonl'),
+                  encoding='utf-8') as source:
+            batch = []
+            for line_number, line in enumerate(source, 1):
+                if not line.strip():
+                    continue
+                try:
+                    batch.append(json.loads(line))
+                except ValueError:
+                    raise CommandError(f'Invalid JSON in line {line_number}')
+                if len(batch) == options['batch_size']:
+                    count += self.import_batch(batch)
+                    batch = []
+                    self.stdout.write(f'Imported {count} recipes')
+            count += self.import_batch(batch)
+        self.stdout.write(self.style.SUCCESS(f'Imported {count} recipes'))
+
+    def import_batch(self, batch):
+        if not batch:
+            return 0
+        authors = dict(User.objects.filter(
+            email__in={item['author'] for item in batch}
+        ).values_list('email', 'id'))
+        self.create_missing_ingredients(batch)
+        images = []
+        try:
+            return self.write_batch(batch, authors, images)
+        except BaseException:
+            for name in images:
+                default_storage.delete(name)
+            raise
+
+    def write_batch(self, batch, authors, images):
+        """
+        Writes the batch in one transaction, names of saved images
+        are collected, so they are deleted if the batch is rolled back.
+        """
+        with transaction.atomic():
+            items, recipes = [], []
+            for item in batch:
+                author = authors.get(item['author'], self.default_author)
+                if author is None:
+                    self.stderr.write(
+                        f'Skipped "{item["name"]}": '
+                        f'unknown author {item["author"]}'
+                    )
+                    continue
+                items.append(item)
+                recipes.append(Recipe(
+                    author_id=author,
+                    name=item['name'],
+                    text=item['text'],
+                    cooking_time=item['cooking_time'],
+                    image=self.import_image(item['image'], images),
+                    tags_mask=get_mask(
+                        self.tags[slug][1] for slug in item['tags']
+                        if slug in self.tags
+                    ),
+                ))
+            recipes = self.create_recipes(recipes)
+            self.restore_pub_dates(items, recipes)
+            links, tags = [], []
+            for item, recipe in zip(items, recipes):
+                links.extend(
+                    IngredientInRecipe(
+                        recipe=recipe,
+                        ingredient_id=self.ingredients[
+                            (ingredient['name'],
+                             ingredient['measurement_unit'])
+                        ],
+                        amount=ingredient['amount'],
+                    )
+                    for ingredient in item['ingredients']
+                )
+                tags.extend(
+                    TagsInRecipe(recipe=recipe, tag_id=self.tags[slug][0])
+                    for slug in item['tags'] if slug in self.tags
+                )
+            IngredientInRecipe.objects.bulk_create(links)
+            TagsInRecipe.objects.bulk_create(tags)
+            recipes_ingredients = {recipe.id: set() for recipe in recipes}
+            for link in links:
+                recipes_ingredients[link.recipe_id].add(link.ingredient_id)
+            add_to_ingredient_index(recipes_ingredients)
+            fan_out_recipes(recipes)
+            refresh_cards([recipe.id for recipe in recipes])
+        return len(recipes)
+
+    def create_missing_ingredients(self, batch):
+        missing = {
+            (ingredient['name'], ingredient['measurement_unit'])
+            for item in batch for ingredient in item['ingredients']
+        } - set(self.ingredients)
+        if not missing:
+            return
+        Ingredient.objects.bulk_create(
+            [Ingredient(name=name, measurement_unit=unit)
+             for name, unit in missing],
+            ignore_conflicts=True
+        )
+        invalidate_catalogue()
+        self.ingredients.update({
+            (name, unit): pk for pk, name, unit in
+            Ingredient.objects.filter(
+                name__in={name for name, _ in missing}
+            ).values_list('id', 'name', 'measurement_unit')
+        })
+
+    def create_recipes(self, recipes):
+        """
+        Uses bulk INSERT, if the database returns ids of inserted rows,
+        and single INSERTs otherwise.
+        """
+        if connection.features.can_return_rows_from_bulk_insert:
+            return Recipe.objects.bulk_create(recipes)
+        for recipe in recipes:
+            recipe.save()
+        return recipes
+
+    def restore_pub_dates(self, items, recipes):
+        """
+        Sets exported publication dates, which are replaced
+        on insert by auto_now_add. Files exported without dates
+        keep the time of import.
+        """
+        restored = []
+        for item, recipe in zip(items, recipes):
+            if item.get('pub_date'):
+                recipe.pub_date = parse_datetime(item['pub_date'])
+                restored.append(recipe)
+        Recipe.objects.bulk_update(restored, ['pub_date'])
+
+    def import_image(self, relative_path, images):
+        if not relative_path:
+            return ''
+        upload_to = Recipe._meta.get_field('image').upload_to
+        with open(os.path.join(self.path, relative_path), 'rb') as image:
+            name = default_storage.save(
+                os.path.join(upload_to, os.path.basename(relative_path)),
+                File(image)
+            )
+        images.append(name)
+        return name
@@ -0,0 +1,13 @@
+from django.core.management.base import BaseCommand
+
+from recipes.ingredient_index import rebuild_ingredient_index
+
+
+class Command(BaseCommand):
+    help = 'Rebuilds inverted index from ingredients to recipes'
+
+    def handle(self, *args, **options):
+        count = rebuild_ingredient_index()
+        self.stdout.write(
+            self.style.SUCCESS(f'Indexed {count} ingredients')
+        )
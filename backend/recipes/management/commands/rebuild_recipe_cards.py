@@ -0,0 +1,24 @@
+from django.core.management.base import BaseCommand
+
+from recipes.cards import BATCH_SIZE, refresh_cards
+from recipes.models import Recipe
+
+
+class Command(BaseCommand):
+    help = 'Rebuilds precomputed JSON cards of all recipes'
+
+    def handle(self, *args, **options):
+        recipe_ids = Recipe.objects.order_by('id').values_list(
+            'id', flat=True
+        )
+        batch = []
+        count = 0
+        for recipe_id in recipe_ids.iterator():
+            batch.append(recipe_id)
+            if len(batch) == BATCH_SIZE:
+                count += len(refresh_cards(batch))
+                batch = []
+        count += len(refresh_cards(batch))
+        self.stdout.write(
+            self.style.SUCCESS(f'Rebuilt {count} recipe cards')
+        )
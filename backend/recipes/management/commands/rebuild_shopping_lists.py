@@ -0,0 +1,13 @@
+from django.core.management.base import BaseCommand
+
+from recipes.shopping_list import rebuild_shopping_lists
+
+
+class Command(BaseCommand):
+    help = 'Rebuilds shopping lists of all users from their shopping carts'
+
+    def handle(self, *args, **options):
+        count = rebuild_shopping_lists()
+        self.stdout.write(
+            self.style.SUCCESS(f'Rebuilt shopping lists of {count} users')
+        )
@@ -0,0 +1,30 @@
+# Generated by Django 3.0.5 on 2026-10-19 09:59
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0002_recipe_search'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='IngredientIndex',
+            fields=[
+                ('ingredient', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='index', serialize=False, to='recipes.Ingredient', verbose_name='Ингредиент')),
+                ('recipes', models.BinaryField(default=b'', verbose_name='Рецепты с ингредиентом')),
+            ],
+            options={
+                'verbose_name': 'Индекс ингредиента',
+                'verbose_name_plural': 'Индекс ингредиентов',
+            },
+        ),
+        migrations.AlterField(
+            model_name='ingredientinrecipe',
+            name='amount',
+            field=models.PositiveSmallIntegerField(blank=True, null=True, verbose_name='Количество ингредиента'),
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 3.0.5 on 2026-10-19 10:05
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0005_timelineentry'),
+    ]
+
+    operations = [
+        migrations.AlterModelOptions(
+            name='ingredientinrecipe',
+            options={'ordering': ['id'], 'verbose_name': 'Количество ингредиента в рецепте', 'verbose_name_plural': 'Количество ингредиента в рецепте'},
+        ),
+    ]
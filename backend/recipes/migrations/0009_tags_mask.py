@@ -0,0 +1,87 @@
+import importlib
+from collections import defaultdict
+
+from django.db import migrations, models
+
+import recipes.bitmask
+
+
+search = importlib.import_module('recipes.migrations.0002_recipe_search')
+
+
+def restore_search_triggers(apps, schema_editor):
+    """
+    SQLite rebuilds recipes_recipe to add or remove a column
+    and loses the full-text search triggers (see 0002_recipe_search).
+    """
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    for sql in search.SQLITE_BACKWARD[:3] + search.SQLITE_FORWARD[1:]:
+        schema_editor.execute(sql)
+
+
+def fill_masks(apps, schema_editor):
+    Tag = apps.get_model('recipes', 'Tag')
+    Recipe = apps.get_model('recipes', 'Recipe')
+    TagsInRecipe = apps.get_model('recipes', 'TagsInRecipe')
+    tags = list(Tag.objects.order_by('id'))
+    if len(tags) > recipes.bitmask.MAX_BITS:
+        raise ValueError(
+            f'Tags mask holds up to {recipes.bitmask.MAX_BITS} tags, '
+            f'there are {len(tags)}: merge or delete tags before migrating'
+        )
+    used = set()
+    for tag in tags:
+        tag.bit = recipes.bitmask.get_free_bit(used)
+        used.add(tag.bit)
+        tag.save(update_fields=['bit'])
+    masks = defaultdict(int)
+    rows = TagsInRecipe.objects.values_list('recipe_id', 'tag__bit')
+    for recipe_id, bit in rows.iterator():
+        masks[recipe_id] |= 1 << bit
+    recipes_by_mask = defaultdict(list)
+    for recipe_id, mask in masks.items():
+        recipes_by_mask[mask].append(recipe_id)
+    for mask, ids in recipes_by_mask.items():
+        for start in range(0, len(ids), 1000):
+            Recipe.objects.filter(
+                id__in=ids[start:start + 1000]
+            ).update(tags_mask=mask)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0008_requestprofile'),
+    ]
+
+    operations = [
+        migrations.RunPython(
+            migrations.RunPython.noop, restore_search_triggers
+        ),
+        migrations.AddField(
+            model_name='tag',
+            name='bit',
+            field=models.PositiveSmallIntegerField(
+                editable=False, null=True, verbose_name='Бит в маске тегов'
+            ),
+        ),
+        migrations.AddField(
+            model_name='recipe',
+            name='tags_mask',
+            field=recipes.bitmask.BitmaskField(
+                default=0, editable=False, verbose_name='Маска тегов'
+            ),
+        ),
+        migrations.RunPython(
+            restore_search_triggers, migrations.RunPython.noop
+        ),
+        migrations.RunPython(fill_masks, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name='tag',
+            name='bit',
+            field=models.PositiveSmallIntegerField(
+                editable=False, unique=True, verbose_name='Бит в маске тегов'
+            ),
+        ),
+    ]
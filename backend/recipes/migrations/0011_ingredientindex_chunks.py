@@ -0,0 +1,42 @@
+from django.db import migrations, models
+import django.db.models.deletion
+
+import recipes.ingredient_index
+
+
+def fill_index(apps, schema_editor):
+    recipes.ingredient_index.rebuild_ingredient_index(
+        apps.get_model('recipes', 'IngredientIndex'),
+        apps.get_model('recipes', 'IngredientInRecipe'),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0010_shoppinglistitem'),
+    ]
+
+    operations = [
+        migrations.DeleteModel(
+            name='IngredientIndex',
+        ),
+        migrations.CreateModel(
+            name='IngredientIndex',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('chunk', models.PositiveIntegerField(verbose_name='Блок рецептов')),
+                ('recipes', models.BinaryField(default=b'', verbose_name='Рецепты с ингредиентом')),
+                ('ingredient', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='index', to='recipes.Ingredient', verbose_name='Ингредиент')),
+            ],
+            options={
+                'verbose_name': 'Индекс ингредиента',
+                'verbose_name_plural': 'Индекс ингредиентов',
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='ingredientindex',
+            constraint=models.UniqueConstraint(fields=('ingredient', 'chunk'), name='unique_ingredient_index_chunk'),
+        ),
+        migrations.RunPython(fill_index, migrations.RunPython.noop),
+    ]
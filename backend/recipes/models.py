@@ -1,6 +1,8 @@
 from django.contrib.auth import get_user_model
 from django.db import models
 
+from .bitmask import MAX_BITS, BitmaskField, get_free_bit
+
 User = get_user_model()
 
 
@@ -42,6 +44,11 @@ class Tag(models.Model):
         unique=True,
         verbose_name='Слаг'
     )
+    bit = models.PositiveSmallIntegerField(
+        unique=True,
+        editable=False,
+        verbose_name='Бит в маске тегов'
+    )
 
     class Meta:
         ordering = ['id']
@@ -51,6 +58,15 @@ class Tag(models.Model):
     def __str__(self):
         return self.name
 
+    def save(self, *args, **kwargs):
+        """New tag takes the lowest bit not used by other tags."""
+        if self.bit is None:
+            bit = get_free_bit(set(Tag.objects.values_list('bit', flat=True)))
+            if bit is None:
+                raise ValueError(f'Can not create more than {MAX_BITS} tags')
+            self.bit = bit
+        super().save(*args, **kwargs)
+
 
 class Ingredient(models.Model):
     """Describes Ingredient model"""
@@ -105,6 +121,11 @@ class Recipe(models.Model):
         upload_to='recipes/images/',
         verbose_name='Изображение',
     )
+    tags_mask = BitmaskField(
+        default=0,
+        editable=False,
+        verbose_name='Маска тегов'
+    )
 
     class Meta:
         ordering = ['-pub_date']
@@ -160,6 +181,7 @@ class IngredientInRecipe(models.Model):
     )
 
     class Meta:
+        ordering = ['id']
         verbose_name = 'Количество ингредиента в рецепте'
         verbose_name_plural = verbose_name
 
@@ -226,3 +248,233 @@ class ShoppingCart(models.Model):
 
     def __str__(self):
         return f'{self.user} added {self.recipe}'
+
+
+class IngredientIndex(models.Model):
+    """
+    Describes inverted index from ingredient to recipes,
+    which is used to find recipes by ingredients the user has.
+    Recipe ids are split into chunks of consecutive ids,
+    every chunk is stored as compressed sorted array
+    (see recipes/ingredient_index.py).
+    """
+
+    ingredient = models.ForeignKey(
+        Ingredient,
+        on_delete=models.CASCADE,
+        related_name='index',
+        verbose_name='Ингредиент'
+    )
+    chunk = models.PositiveIntegerField(verbose_name='Блок рецептов')
+    recipes = models.BinaryField(
+        default=b'',
+        verbose_name='Рецепты с ингредиентом'
+    )
+
+    class Meta:
+        verbose_name = 'Индекс ингредиента'
+        verbose_name_plural = 'Индекс ингредиентов'
+        constraints = [
+            models.UniqueConstraint(
+                fields=['ingredient', 'chunk'],
+                name='unique_ingredient_index_chunk'
+            ),
+        ]
+
+    def __str__(self):
+        return f'{self.ingredient} index, chunk {self.chunk}'
+
+
+class SimilarRecipe(models.Model):
+    """
+    Describes precomputed similar recipes
+    (see management command compute_similar_recipes).
+    """
+
+    recipe = models.ForeignKey(
+        Recipe,
+        on_delete=models.CASCADE,
+        related_name='similar',
+        verbose_name='Рецепт'
+    )
+    similar = models.ForeignKey(
+        Recipe,
+        on_delete=models.CASCADE,
+        related_name='similar_for',
+        verbose_name='Похожий рецепт'
+    )
+    score = models.FloatField(verbose_name='Сходство')
+
+    class Meta:
+        ordering = ['recipe', '-score']
+        verbose_name = 'Похожий рецепт'
+        verbose_name_plural = 'Похожие рецепты'
+        constraints = [
+            models.UniqueConstraint(
+                fields=['recipe', 'similar'], name='unique_similar_recipe'
+            )
+        ]
+        indexes = [
+            models.Index(
+                fields=['recipe', '-score'], name='similar_recipe_score_idx'
+            )
+        ]
+
+    def __str__(self):
+        return f'{self.similar} is similar to {self.recipe}'
+
+
+class TimelineEntry(models.Model):
+    """
+    Describes materialized timeline of the recipes of followed authors
+    (see recipes/timeline.py).
+    Author and publication date are copied from recipe,
+    so the timeline is read and trimmed without joins.
+    """
+
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='timeline',
+        verbose_name='Пользователь'
+    )
+    recipe = models.ForeignKey(
+        Recipe,
+        on_delete=models.CASCADE,
+        related_name='timeline_entries',
+        verbose_name='Рецепт'
+    )
+    author = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='+',
+        verbose_name='Автор'
+    )
+    pub_date = models.DateTimeField(verbose_name='Время публикации')
+
+    class Meta:
+        ordering = ['-pub_date']
+        verbose_name = 'Запись ленты'
+        verbose_name_plural = 'Лента подписок'
+        constraints = [
+            models.UniqueConstraint(
+                fields=['user', 'recipe'], name='unique_timeline_entry'
+            )
+        ]
+        indexes = [
+            models.Index(
+                fields=['user', '-pub_date'], name='timeline_user_date_idx'
+            ),
+            models.Index(
+                fields=['user', 'author'], name='timeline_user_author_idx'
+            ),
+        ]
+
+    def __str__(self):
+        return f'{self.recipe} in timeline of {self.user}'
+
+
+class RecipeCard(models.Model):
+    """
+    Describes precomputed public representation of recipe in JSON
+    without per-user flags (see recipes/cards.py).
+    """
+
+    recipe = models.OneToOneField(
+        Recipe,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='card',
+        verbose_name='Рецепт'
+    )
+    data = models.TextField(verbose_name='Карточка рецепта')
+
+    class Meta:
+        verbose_name = 'Карточка рецепта'
+        verbose_name_plural = 'Карточки рецептов'
+
+    def __str__(self):
+        return f'{self.recipe} card'
+
+
+class RequestProfile(models.Model):
+    """
+    Describes profile of one API request made by a staff user
+    with X-Profile header or ?profile= parameter
+    (see foodgram/profiling.py).
+    """
+
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='request_profiles',
+        verbose_name='Пользователь'
+    )
+    created = models.DateTimeField(
+        auto_now_add=True,
+        verbose_name='Дата'
+    )
+    method = models.CharField(max_length=10, verbose_name='Метод')
+    path = models.CharField(max_length=2000, verbose_name='Адрес')
+    status_code = models.PositiveSmallIntegerField(verbose_name='Статус')
+    duration = models.FloatField(verbose_name='Время, с')
+    queries_count = models.PositiveIntegerField(
+        verbose_name='Запросов к БД'
+    )
+    queries_duration = models.FloatField(verbose_name='Время запросов, с')
+    report = models.TextField(verbose_name='Отчёт')
+    stats = models.BinaryField(verbose_name='Данные cProfile')
+
+    class Meta:
+        ordering = ['-created']
+        verbose_name = 'Профиль запроса'
+        verbose_name_plural = 'Профили запросов'
+
+    def __str__(self):
+        return f'{self.method} {self.path} ({self.created})'
+
+
+class ShoppingListItem(models.Model):
+    """
+    Describes materialized row of user's shopping list:
+    total amount of the ingredient in the recipes of the shopping cart
+    (see recipes/shopping_list.py).
+    """
+
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='shopping_list',
+        verbose_name='Пользователь'
+    )
+    ingredient = models.ForeignKey(
+        Ingredient,
+        on_delete=models.CASCADE,
+        related_name='+',
+        verbose_name='Ингредиент'
+    )
+    amount = models.IntegerField(
+        default=0,
+        verbose_name='Количество'
+    )
+    amounts_count = models.IntegerField(
+        default=0,
+        verbose_name='Рецептов с количеством'
+    )
+    recipes_count = models.IntegerField(
+        default=0,
+        verbose_name='Рецептов'
+    )
+
+    class Meta:
+        verbose_name = 'Ингредиент в списке покупок'
+        verbose_name_plural = 'Списки покупок'
+        constraints = [
+            models.UniqueConstraint(
+                fields=['user', 'ingredient'],
+                name='unique_shopping_list_item'
+            ),
+        ]
+
+    def __str__(self):
+        return f'{self.ingredient} in shopping list of {self.user}'
@@ -1,6 +1,33 @@
+from django.core.paginator import Paginator
+from django.db import connections
+from django.utils.functional import cached_property
 from rest_framework.pagination import PageNumberPagination
 
 
 class PageNumberPaginatorModified(PageNumberPagination):
 
     page_size_query_param = 'limit'
+
+
+class EstimatedCountPaginator(Paginator):
+    """
+    Describes paginator, which takes the number of rows of unfiltered
+    PostgreSQL queryset from table statistics instead of COUNT(*).
+    Small tables and filtered querysets are counted exactly.
+    """
+    ESTIMATE_FROM = 100000
+
+    @cached_property
+    def count(self):
+        queryset = self.object_list
+        connection = connections[queryset.db]
+        if connection.vendor == 'postgresql' and not queryset.query.where:
+            with connection.cursor() as cursor:
+                cursor.execute(
+                    'SELECT reltuples FROM pg_class WHERE relname = %s',
+                    [queryset.model._meta.db_table]
+                )
+                row = cursor.fetchone()
+            if row is not None and row[0] >= self.ESTIMATE_FROM:
+                return int(row[0])
+        return super().count
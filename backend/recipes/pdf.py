@@ -0,0 +1,32 @@
+import io
+
+from reportlab.pdfbase import pdfmetrics
+from reportlab.pdfbase.ttfonts import TTFont
+from reportlab.pdfgen import canvas
+
+from foodgram import metrics
+
+FONT_NAME = 'DejaVuSerif'
+FONT_FILE = 'DejaVuSerif.ttf'
+
+
+def register_font():
+    """Parses the font file once per process."""
+    if FONT_NAME not in pdfmetrics.getRegisteredFontNames():
+        pdfmetrics.registerFont(TTFont(FONT_NAME, FONT_FILE))
+
+
+def render_lines(lines):
+    """Returns PDF document with the lines as bytes."""
+    with metrics.timer('foodgram_pdf_render_seconds'):
+        register_font()
+        buffer = io.BytesIO()
+        p = canvas.Canvas(buffer)
+        p.setFont(FONT_NAME, 15)
+        height = 800
+        for line in lines:
+            p.drawString(50, height, line)
+            height -= 25
+        p.showPage()
+        p.save()
+        return buffer.getvalue()
@@ -0,0 +1,153 @@
+from django.db import IntegrityError, connections, router, transaction
+from django.db.models import sql
+from rest_framework import status
+from rest_framework.permissions import IsAuthenticated
+from rest_framework.response import Response
+from rest_framework.views import APIView
+
+from foodgram.metrics import MetricsMixin
+
+from .serializers import BulkIdsSerializer
+
+
+def create_relation(model, **fields):
+    """
+    Inserts a user relation (favorite, shopping cart, subscription)
+    relying on its unique constraint instead of checking existence first.
+    Returns None if the relation already exists.
+    """
+    try:
+        with transaction.atomic():
+            return model.objects.create(**fields)
+    except IntegrityError:
+        return None
+
+
+def delete_relation(model, **fields):
+    """
+    Deletes a user relation with a single DELETE.
+    Returns False if there was nothing to delete.
+    """
+    deleted, _ = model.objects.filter(**fields).delete()
+    return deleted > 0
+
+
+def insert_relations(model, objs, returning):
+    """
+    Inserts user relations with a single INSERT ignoring unique
+    constraint conflicts (ON CONFLICT DO NOTHING, INSERT OR IGNORE
+    on SQLite). Returns values of the returning field of the rows,
+    which were actually inserted, so relations inserted concurrently
+    by another request are not reported twice.
+    """
+    if not objs:
+        return []
+    using = router.db_for_write(model)
+    connection = connections[using]
+    fields = [field for field in model._meta.concrete_fields
+              if not field.primary_key]
+    query = sql.InsertQuery(model, ignore_conflicts=True)
+    query.insert_values(fields, objs)
+    [(statement, params)] = query.get_compiler(using=using).as_sql()
+    column = connection.ops.quote_name(model._meta.get_field(returning).column)
+    with connection.cursor() as cursor:
+        cursor.execute(f'{statement} RETURNING {column}', params)
+        return [row[0] for row in cursor.fetchall()]
+
+
+class BulkRelationView(MetricsMixin, APIView):
+    """
+    Describes base APIView to add and remove many user relations
+    (favorites, shopping cart, subscriptions) in one request:
+    {"add": [<id>, ...], "remove": [<id>, ...]}.
+    All changes are made in one transaction: adds with a single
+    INSERT ignoring unique constraint conflicts, removes with a single
+    DELETE ... IN of the relations locked by SELECT ... FOR UPDATE.
+    Statuses and hooks are based on the rows actually inserted
+    and deleted, not on what existed before.
+    Returns status for every requested id.
+    """
+    CREATED = 'created'
+    EXISTS = 'exists'
+    DELETED = 'deleted'
+    NOT_FOUND = 'not_found'
+
+    permission_classes = [IsAuthenticated, ]
+    throttle_scope = 'write'
+    model = None
+    target_model = None
+    target_field = None
+
+    def check_target(self, request, target_id):
+        """Returns error status for id, which can't be added, or None."""
+        return None
+
+    def after_add(self, user, target_ids):
+        """Hook called in transaction after relations are created."""
+
+    def after_remove(self, user, target_ids):
+        """Hook called in transaction after relations are deleted."""
+
+    def get_results(self, action, target_ids, errors, done,
+                    done_status, other_status):
+        """
+        Returns statuses of the requested ids: an error,
+        done_status for ids changed by the request or other_status.
+        """
+        return [
+            {
+                'id': target_id,
+                'action': action,
+                'status': errors.get(target_id) or (
+                    done_status if target_id in done else other_status
+                ),
+            }
+            for target_id in target_ids
+        ]
+
+    def post(self, request):
+        serializer = BulkIdsSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        to_add = serializer.validated_data['add']
+        to_remove = serializer.validated_data['remove']
+        user = request.user
+        field = self.target_field
+        requested = set(to_add) | set(to_remove)
+        with transaction.atomic():
+            found = set(self.target_model.objects.filter(
+                id__in=requested
+            ).values_list('id', flat=True))
+            related = set(self.model.objects.select_for_update().filter(
+                user=user, **{f'{field}__in': requested}
+            ).values_list(f'{field}_id', flat=True))
+            errors = {}
+            new_ids = []
+            for target_id in to_add:
+                result = self.check_target(request, target_id)
+                if result is None and target_id not in found:
+                    result = self.NOT_FOUND
+                if result is not None:
+                    errors[target_id] = result
+                elif target_id not in related:
+                    new_ids.append(target_id)
+            created = insert_relations(self.model, [
+                self.model(user=user, **{f'{field}_id': target_id})
+                for target_id in new_ids
+            ], field)
+            if created:
+                self.after_add(user, created)
+            deleted = [
+                target_id for target_id in to_remove if target_id in related
+            ]
+            if deleted:
+                self.model.objects.filter(
+                    user=user, **{f'{field}__in': deleted}
+                ).delete()
+                self.after_remove(user, deleted)
+        results = [
+            *self.get_results('add', to_add, errors, set(created),
+                              self.CREATED, self.EXISTS),
+            *self.get_results('remove', to_remove, {}, set(deleted),
+                              self.DELETED, self.NOT_FOUND),
+        ]
+        return Response({'results': results}, status=status.HTTP_200_OK)
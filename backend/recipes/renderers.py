@@ -0,0 +1,83 @@
+import csv
+import io
+import json
+
+from rest_framework import renderers
+
+
+class ShoppingListRenderer(renderers.BaseRenderer):
+    """
+    Describes base renderer of the buying list
+    (see recipes/shopping_list.py -> get_buying_list).
+    Text renderers yield the output line by line in iter_render,
+    so the list can be sent as a streaming response. By default
+    every item is rendered as a line of plain text.
+    """
+    charset = 'utf-8'
+    streaming = True
+
+    def iter_render(self, buying_list):
+        for item in buying_list:
+            yield f'{self.format_item(item)}\n'
+
+    def format_item(self, item):
+        line = f"{item['name']} ({item['measurement_unit']})"
+        if item['amount'] is None:
+            return line
+        return f"{line} - {item['amount']}"
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        return ''.join(self.iter_render(data)).encode(self.charset)
+
+
+class ShoppingListTextRenderer(ShoppingListRenderer):
+    media_type = 'text/plain'
+    format = 'txt'
+
+
+class ShoppingListCSVRenderer(ShoppingListRenderer):
+    media_type = 'text/csv'
+    format = 'csv'
+    header = ('name', 'measurement_unit', 'amount')
+
+    def iter_render(self, buying_list):
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        for row in self.iter_rows(buying_list):
+            writer.writerow(row)
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+
+    def iter_rows(self, buying_list):
+        yield self.header
+        for item in buying_list:
+            yield [item[field] for field in self.header]
+
+
+class ShoppingListJSONRenderer(ShoppingListRenderer):
+    media_type = 'application/json'
+    format = 'json'
+
+    def iter_render(self, buying_list):
+        yield '['
+        for number, item in enumerate(buying_list):
+            yield (',' if number else '') + json.dumps(
+                item, ensure_ascii=False
+            )
+        yield ']'
+
+
+class ShoppingListPDFRenderer(ShoppingListRenderer):
+    media_type = 'application/pdf'
+    format = 'pdf'
+    charset = None
+    render_style = 'binary'
+    streaming = False
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        # reportlab is heavy and needed only here,
+        # so it is not imported on startup (see check_startup_imports).
+        from .pdf import render_lines
+
+        return render_lines(self.format_item(item) for item in data)
@@ -0,0 +1,53 @@
+from django.db import connections
+from django.db.models import BooleanField, FloatField
+from django.db.models.expressions import RawSQL
+
+POSTGRESQL_MATCH = (
+    "recipes_recipe.search_vector @@ plainto_tsquery('pg_catalog.russian', %s)"
+)
+POSTGRESQL_RANK = (
+    "ts_rank(recipes_recipe.search_vector, "
+    "plainto_tsquery('pg_catalog.russian', %s))"
+)
+SQLITE_MATCH = (
+    'recipes_recipe.id IN (SELECT rowid FROM recipes_recipe_fts '
+    'WHERE recipes_recipe_fts MATCH %s)'
+)
+SQLITE_RANK = (
+    '(SELECT -bm25(recipes_recipe_fts, 10.0, 1.0) FROM recipes_recipe_fts '
+    'WHERE recipes_recipe_fts MATCH %s AND rowid = recipes_recipe.id)'
+)
+
+
+def get_fts5_query(query):
+    """
+    Builds FTS5 query, which matches recipes containing
+    all words of the query as prefixes.
+    FTS5 has no Russian stemmer, so prefix match is used instead.
+    """
+    words = [word.replace('"', '""') for word in query.split()]
+    return ' '.join(f'"{word}"*' for word in words)
+
+
+def search_recipes(queryset, query):
+    """
+    Filters recipes by full-text query on name and text
+    and orders them by relevance.
+    PostgreSQL uses the search_vector column with GIN index,
+    SQLite uses recipes_recipe_fts FTS5 table
+    (see migrations/0002_recipe_search.py).
+    """
+    vendor = connections[queryset.db].vendor
+    if vendor == 'postgresql':
+        match, rank, params = POSTGRESQL_MATCH, POSTGRESQL_RANK, (query,)
+    elif vendor == 'sqlite':
+        query = get_fts5_query(query)
+        if not query:
+            return queryset
+        match, rank, params = SQLITE_MATCH, SQLITE_RANK, (query,)
+    else:
+        return queryset.filter(name__icontains=query)
+    return queryset.annotate(
+        search_match=RawSQL(match, params, output_field=BooleanField()),
+        search_rank=RawSQL(rank, params, output_field=FloatField()),
+    ).filter(search_match=True).order_by('-search_rank', '-pub_date')
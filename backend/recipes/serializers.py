@@ -1,11 +1,17 @@
 from django.contrib.auth import get_user_model
+from django.db import transaction
 from rest_framework import serializers
 
 from recipes.models import (Favorite, Ingredient, IngredientInRecipe, Recipe,
                             ShoppingCart, Tag, TagsInRecipe)
 from users.serializers import ShowRecipeAddedSerializer, UserSerializerModified
 
+from .cards import refresh_cards
 from .fields import Base64ImageField
+from .ingredient_index import update_ingredient_index
+from .shopping_list import get_recipes_delta, update_shopping_lists
+from .tag_mask import get_tags_mask
+from .timeline import fan_out_recipe
 
 User = get_user_model()
 
@@ -38,6 +44,15 @@ class IngredientInRecipeSerializer(serializers.ModelSerializer):
 
 
 class ShowRecipeSerializer(serializers.ModelSerializer):
+    """
+    Describes Recipe serializer for GET requests.
+    Supports sparse fieldsets: if fields or expand are passed,
+    only selected fields are serialized (COMPACT_FIELDS by default),
+    and related fields, which are not expanded, are shown as ids.
+    """
+    COMPACT_FIELDS = ('id', 'name', 'image', 'cooking_time')
+    RELATED_FIELDS = ('tags', 'author', 'ingredients')
+
     tags = TagSerializer(many=True, read_only=True)
     author = UserSerializerModified(read_only=True)
     ingredients = serializers.SerializerMethodField()
@@ -50,11 +65,48 @@ class ShowRecipeSerializer(serializers.ModelSerializer):
                   'is_favorited', 'is_in_shopping_cart',
                   'name', 'image', 'text', 'cooking_time')
 
+    def __init__(self, *args, fields=None, expand=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        if fields is None and expand is None:
+            return
+        selected, expanded = self.get_fieldset(fields, expand)
+        for name in set(self.fields) - selected:
+            self.fields.pop(name)
+        id_fields = {
+            'tags': serializers.PrimaryKeyRelatedField(
+                many=True, read_only=True
+            ),
+            'author': serializers.PrimaryKeyRelatedField(read_only=True),
+            'ingredients': serializers.SerializerMethodField(
+                method_name='get_ingredient_ids'
+            ),
+        }
+        for name in selected & set(self.RELATED_FIELDS) - expanded:
+            self.fields[name] = id_fields[name]
+
+    @classmethod
+    def get_fieldset(cls, fields=None, expand=None):
+        """Returns names of selected and expanded fields."""
+        if fields is None and expand is None:
+            return set(cls.Meta.fields), set(cls.RELATED_FIELDS)
+        expanded = set(expand or ()) & set(cls.RELATED_FIELDS)
+        selected = (set(fields or cls.COMPACT_FIELDS) | expanded) & set(
+            cls.Meta.fields
+        )
+        return selected, expanded
+
     def get_ingredients(self, obj):
-        qs = IngredientInRecipe.objects.filter(recipe=obj)
+        qs = obj.ingredientinrecipe_set.all()
         return IngredientInRecipeSerializer(qs, many=True).data
 
+    def get_ingredient_ids(self, obj):
+        return [
+            item.ingredient_id for item in obj.ingredientinrecipe_set.all()
+        ]
+
     def get_is_favorited(self, obj):
+        if hasattr(obj, 'favorited'):
+            return obj.favorited
         request = self.context.get('request')
         if request is None or request.user.is_anonymous:
             return False
@@ -62,6 +114,8 @@ class ShowRecipeSerializer(serializers.ModelSerializer):
         return Favorite.objects.filter(recipe=obj, user=user).exists()
 
     def get_is_in_shopping_cart(self, obj):
+        if hasattr(obj, 'in_shopping_cart'):
+            return obj.in_shopping_cart
         request = self.context.get('request')
         if request is None or request.user.is_anonymous:
             return False
@@ -95,6 +149,7 @@ class CreateRecipeSerializer(serializers.ModelSerializer):
         fields = ('id', 'tags', 'author', 'ingredients',
                   'name', 'image', 'text', 'cooking_time')
 
+    @transaction.atomic
     def create(self, validated_data):
         """
         Only authorized users can send POST/PUT request methods
@@ -107,7 +162,9 @@ class CreateRecipeSerializer(serializers.ModelSerializer):
                 raise serializers.ValidationError(self.AMOUNT_ERROR_MESSAGE)
         tags_data = validated_data.pop('tags')
         author = self.context.get('request').user
-        recipe = Recipe.objects.create(author=author, **validated_data)
+        recipe = Recipe.objects.create(
+            author=author, tags_mask=get_tags_mask(tags_data), **validated_data
+        )
         for ingredient in ingredients_data:
             ingredient_model = Ingredient.objects.get(id=ingredient['id'])
             amount = ingredient['amount']
@@ -118,14 +175,26 @@ class CreateRecipeSerializer(serializers.ModelSerializer):
             )
         for tag in tags_data:
             TagsInRecipe.objects.create(recipe=recipe, tag=tag)
+        update_ingredient_index(
+            recipe.id,
+            [],
+            [ingredient['id'] for ingredient in ingredients_data]
+        )
+        fan_out_recipe(recipe)
+        refresh_cards([recipe.id])
         return recipe
 
+    @transaction.atomic
     def update(self, instance, validated_data):
         tags_data = validated_data.pop('tags')
         ingredient_data = validated_data.pop('ingredients')
         for ingredient in ingredient_data:
             if ingredient['amount'] < 0:
                 raise serializers.ValidationError(self.AMOUNT_ERROR_MESSAGE)
+        old_ingredients = list(IngredientInRecipe.objects.filter(
+            recipe=instance
+        ).values_list('ingredient_id', flat=True))
+        old_delta = get_recipes_delta([instance.id], sign=-1)
         TagsInRecipe.objects.filter(recipe=instance).delete()
         for tag in tags_data:
             TagsInRecipe.objects.create(
@@ -139,12 +208,20 @@ class CreateRecipeSerializer(serializers.ModelSerializer):
                 recipe=instance,
                 amount=new_ingredient['amount']
             )
+        update_ingredient_index(
+            instance.id,
+            old_ingredients,
+            [ingredient['id'] for ingredient in ingredient_data]
+        )
+        update_shopping_lists(instance.id, old_delta)
         instance.name = validated_data.pop('name')
         instance.text = validated_data.pop('text')
         if validated_data.get('image') is not None:
             instance.image = validated_data.pop('image')
         instance.cooking_time = validated_data.pop('cooking_time')
+        instance.tags_mask = get_tags_mask(tags_data)
         instance.save()
+        refresh_cards([instance.id])
         return instance
 
     def to_representation(self, instance):
@@ -177,3 +254,58 @@ class ShoppingCartSerializer(FavoriteSerializer):
 
     class Meta(FavoriteSerializer.Meta):
         model = ShoppingCart
+
+
+class BulkIdsSerializer(serializers.Serializer):
+    """
+    Describes serializer of ids lists, which will be used
+    by bulk add/remove views.
+    """
+    MAX_IDS = 100
+    BOTH_ACTIONS_ERROR_MESSAGE = 'Нельзя одновременно добавить и удалить'
+    EMPTY_ERROR_MESSAGE = 'Передайте id для добавления или удаления'
+
+    add = serializers.ListField(
+        child=serializers.IntegerField(min_value=1),
+        max_length=MAX_IDS,
+        required=False,
+        default=list
+    )
+    remove = serializers.ListField(
+        child=serializers.IntegerField(min_value=1),
+        max_length=MAX_IDS,
+        required=False,
+        default=list
+    )
+
+    def validate(self, attrs):
+        attrs['add'] = list(dict.fromkeys(attrs['add']))
+        attrs['remove'] = list(dict.fromkeys(attrs['remove']))
+        if not attrs['add'] and not attrs['remove']:
+            raise serializers.ValidationError(self.EMPTY_ERROR_MESSAGE)
+        both = set(attrs['add']) & set(attrs['remove'])
+        if both:
+            ids = ', '.join(str(item) for item in sorted(both))
+            raise serializers.ValidationError(
+                {'remove': f'{self.BOTH_ACTIONS_ERROR_MESSAGE}: {ids}'}
+            )
+        return attrs
+
+
+class CookWithSerializer(serializers.Serializer):
+    """
+    Describes query parameters of search by ingredients the user has.
+    """
+    MAX_INGREDIENTS = 30
+    MAX_MISSING = 10
+
+    ingredients = serializers.ListField(
+        child=serializers.IntegerField(min_value=1),
+        min_length=1,
+        max_length=MAX_INGREDIENTS
+    )
+    max_missing = serializers.IntegerField(
+        min_value=0,
+        max_value=MAX_MISSING,
+        default=0
+    )
@@ -0,0 +1,198 @@
+from django.db.models import Case, Count, F, IntegerField, Sum, Value, When
+
+from .models import IngredientInRecipe, ShoppingCart, ShoppingListItem
+from .units import normalize_unit
+
+BATCH_SIZE = 1000
+AMOUNT, AMOUNTS_COUNT, RECIPES_COUNT = range(3)
+
+
+def get_shopping_list(user):
+    """
+    Returns ingredients of the recipes in user's shopping cart
+    with summarized amount in canonical units
+    (see recipes/units.py -> UNIT_CONVERSIONS) and the number
+    of recipes they come from.
+    Rows are read from the materialized ShoppingListItem table
+    and converted in a single pass.
+    Amount is None for "по вкусу" items and for items
+    without any amount.
+    """
+    rows = ShoppingListItem.objects.filter(user=user).values_list(
+        'ingredient__name', 'ingredient__measurement_unit',
+        'amount', 'amounts_count', 'recipes_count'
+    ).order_by('ingredient__name')
+    totals = {}
+    for name, unit, amount, amounts_count, recipes_count in rows:
+        unit, factor = normalize_unit(unit)
+        item = totals.setdefault((name, unit), {
+            'name': name,
+            'measurement_unit': unit,
+            'amount': None,
+            'recipes_count': 0,
+        })
+        item['recipes_count'] += recipes_count
+        if factor is not None and amounts_count:
+            item['amount'] = (item['amount'] or 0) + amount * factor
+    return list(totals.values())
+
+
+def get_buying_list(user):
+    """
+    Returns the shopping list for download:
+    name, measurement_unit and amount of every ingredient.
+    """
+    return [
+        {
+            'name': item['name'],
+            'measurement_unit': item['measurement_unit'],
+            'amount': item['amount'],
+        }
+        for item in get_shopping_list(user)
+    ]
+
+
+def get_recipes_delta(recipe_ids, sign=1):
+    """
+    Returns {ingredient_id: [amount, amounts_count, recipes_count]}
+    which the recipes add to a shopping list (sign=1)
+    or remove from it (sign=-1).
+    """
+    rows = IngredientInRecipe.objects.filter(
+        recipe_id__in=recipe_ids
+    ).values('recipe_id', 'ingredient_id').annotate(
+        total=Sum('amount'), amounts=Count('amount')
+    ).order_by()
+    delta = {}
+    for row in rows:
+        item = delta.setdefault(row['ingredient_id'], [0, 0, 0])
+        item[AMOUNT] += sign * (row['total'] or 0)
+        item[AMOUNTS_COUNT] += sign * row['amounts']
+        item[RECIPES_COUNT] += sign
+    return delta
+
+
+def merge_deltas(*deltas):
+    merged = {}
+    for delta in deltas:
+        for ingredient_id, values in delta.items():
+            item = merged.setdefault(ingredient_id, [0, 0, 0])
+            for number, value in enumerate(values):
+                item[number] += value
+    return {
+        ingredient_id: values for ingredient_id, values in merged.items()
+        if any(values)
+    }
+
+
+def get_delta_case(delta, index):
+    return Case(
+        *[When(ingredient_id=ingredient_id, then=Value(values[index]))
+          for ingredient_id, values in delta.items()],
+        default=Value(0),
+        output_field=IntegerField()
+    )
+
+
+def apply_delta(user_ids, delta):
+    """
+    Applies the delta to shopping lists of the users
+    (list of ids or queryset of ids) with a single UPDATE:
+    missing rows are created first, rows without recipes are deleted.
+    """
+    if not delta:
+        return
+    new_ingredients = [
+        ingredient_id for ingredient_id, values in delta.items()
+        if values[RECIPES_COUNT] > 0
+    ]
+    if new_ingredients:
+        batch = []
+        for user_id in user_ids:
+            batch.extend(
+                ShoppingListItem(user_id=user_id, ingredient_id=ingredient_id)
+                for ingredient_id in new_ingredients
+            )
+            if len(batch) >= BATCH_SIZE:
+                ShoppingListItem.objects.bulk_create(
+                    batch, ignore_conflicts=True
+                )
+                batch = []
+        ShoppingListItem.objects.bulk_create(batch, ignore_conflicts=True)
+    items = ShoppingListItem.objects.filter(
+        user_id__in=user_ids, ingredient_id__in=delta
+    )
+    items.update(
+        amount=F('amount') + get_delta_case(delta, AMOUNT),
+        amounts_count=F('amounts_count') + get_delta_case(
+            delta, AMOUNTS_COUNT
+        ),
+        recipes_count=F('recipes_count') + get_delta_case(
+            delta, RECIPES_COUNT
+        ),
+    )
+    items.filter(recipes_count__lte=0).delete()
+
+
+def add_to_shopping_list(user_id, recipe_ids):
+    apply_delta([user_id], get_recipes_delta(recipe_ids))
+
+
+def remove_from_shopping_list(user_id, recipe_ids):
+    apply_delta([user_id], get_recipes_delta(recipe_ids, sign=-1))
+
+
+def get_cart_users(recipe_id):
+    return ShoppingCart.objects.filter(
+        recipe_id=recipe_id
+    ).values_list('user_id', flat=True)
+
+
+def update_shopping_lists(recipe_id, old_delta):
+    """
+    Applies changes of the recipe's ingredients to shopping lists
+    of all users having it in the cart. old_delta is
+    get_recipes_delta([recipe_id], sign=-1) taken before the change.
+    """
+    apply_delta(
+        get_cart_users(recipe_id),
+        merge_deltas(old_delta, get_recipes_delta([recipe_id]))
+    )
+
+
+def rebuild_shopping_lists(user_ids=None, batch_size=BATCH_SIZE):
+    """
+    Recomputes shopping lists of the users (all users if None)
+    from their shopping carts, batch_size users at a time.
+    Returns the number of processed users.
+    """
+    carts = ShoppingCart.objects.all()
+    items = ShoppingListItem.objects.all()
+    if user_ids is not None:
+        carts = carts.filter(user_id__in=user_ids)
+        items = items.filter(user_id__in=user_ids)
+    items.exclude(
+        user_id__in=carts.values('user_id')
+    ).delete()
+    users = list(carts.values_list('user_id', flat=True).distinct())
+    for start in range(0, len(users), batch_size):
+        batch = users[start:start + batch_size]
+        rows = IngredientInRecipe.objects.filter(
+            recipe__shopping_cart__user_id__in=batch
+        ).values('recipe__shopping_cart__user_id', 'ingredient_id').annotate(
+            total=Sum('amount'),
+            amounts=Count('amount'),
+            recipes=Count('recipe_id', distinct=True)
+        ).order_by()
+        ShoppingListItem.objects.filter(user_id__in=batch).delete()
+        ShoppingListItem.objects.bulk_create([
+            ShoppingListItem(
+                user_id=row['recipe__shopping_cart__user_id'],
+                ingredient_id=row['ingredient_id'],
+                amount=row['total'] or 0,
+                amounts_count=row['amounts'],
+                recipes_count=row['recipes'],
+            )
+            for row in rows
+        ], batch_size=batch_size)
+    return len(users)
@@ -0,0 +1,78 @@
+from django.contrib.auth import get_user_model
+from django.db.models.signals import post_delete, post_save, pre_delete
+from django.dispatch import receiver
+
+from .cards import refresh_cards, refresh_cards_on_commit
+from .catalogue import invalidate_catalogue
+from .ingredient_index import update_ingredient_index
+from .models import Ingredient, IngredientInRecipe, Recipe, Tag, TagsInRecipe
+from .shopping_list import apply_delta, get_cart_users, get_recipes_delta
+from .tag_mask import remove_tag_from_masks
+
+User = get_user_model()
+
+AUTHOR_CARD_FIELDS = {'email', 'username', 'first_name', 'last_name'}
+
+
+@receiver(pre_delete, sender=Recipe)
+def remove_recipe_from_ingredient_index(sender, instance, **kwargs):
+    ingredients = IngredientInRecipe.objects.filter(
+        recipe=instance
+    ).values_list('ingredient_id', flat=True)
+    update_ingredient_index(instance.id, ingredients, [])
+
+
+@receiver(pre_delete, sender=Recipe)
+def remove_recipe_from_shopping_lists(sender, instance, **kwargs):
+    apply_delta(
+        get_cart_users(instance.id),
+        get_recipes_delta([instance.id], sign=-1)
+    )
+
+
+@receiver(post_save, sender=User)
+def refresh_author_cards(sender, instance, created, update_fields=None,
+                         **kwargs):
+    if created or (update_fields
+                   and not AUTHOR_CARD_FIELDS & set(update_fields)):
+        return
+    refresh_cards(Recipe.objects.filter(
+        author=instance
+    ).values_list('id', flat=True))
+
+
+@receiver(post_save, sender=Tag)
+def refresh_tag_cards(sender, instance, **kwargs):
+    refresh_cards(TagsInRecipe.objects.filter(
+        tag=instance
+    ).values_list('recipe_id', flat=True).distinct())
+
+
+@receiver(pre_delete, sender=Tag)
+def refresh_deleted_tag_cards(sender, instance, **kwargs):
+    refresh_cards_on_commit(TagsInRecipe.objects.filter(
+        tag=instance
+    ).values_list('recipe_id', flat=True).distinct())
+    remove_tag_from_masks(instance)
+
+
+@receiver(post_save, sender=Ingredient)
+def refresh_ingredient_cards(sender, instance, **kwargs):
+    refresh_cards(IngredientInRecipe.objects.filter(
+        ingredient=instance
+    ).values_list('recipe_id', flat=True).distinct())
+
+
+@receiver(pre_delete, sender=Ingredient)
+def refresh_deleted_ingredient_cards(sender, instance, **kwargs):
+    refresh_cards_on_commit(IngredientInRecipe.objects.filter(
+        ingredient=instance
+    ).values_list('recipe_id', flat=True).distinct())
+
+
+@receiver(post_save, sender=Tag)
+@receiver(post_delete, sender=Tag)
+@receiver(post_save, sender=Ingredient)
+@receiver(post_delete, sender=Ingredient)
+def invalidate_catalogue_cache(sender, **kwargs):
+    invalidate_catalogue()
@@ -0,0 +1,105 @@
+import heapq
+from collections import Counter
+
+from django.db import transaction
+
+from .models import IngredientInRecipe, SimilarRecipe, TagsInRecipe
+
+
+def load_features():
+    """
+    Returns sparse feature sets of all recipes: ingredient ids
+    and tag ids (stored as negative numbers to keep them apart).
+    """
+    features = {}
+    ingredients = IngredientInRecipe.objects.values_list(
+        'recipe_id', 'ingredient_id'
+    ).order_by()
+    for recipe_id, ingredient_id in ingredients.iterator():
+        features.setdefault(recipe_id, set()).add(ingredient_id)
+    tags = TagsInRecipe.objects.values_list('recipe_id', 'tag_id').order_by()
+    for recipe_id, tag_id in tags.iterator():
+        features.setdefault(recipe_id, set()).add(-tag_id)
+    return features
+
+
+def build_postings(features, max_df, min_df, fallback_size):
+    """
+    Builds inverted index from ingredient to recipes for
+    candidate generation. Ingredients present in more than
+    max_df share of recipes (salt, sugar) are skipped: they don't
+    make recipes similar, but would make every pair a candidate.
+    The cutoff is never lower than min_df recipes, so small catalogues
+    keep all their ingredients.
+    Skipped ingredients and tags go to the fallback index
+    with at most fallback_size recipes each.
+    """
+    postings = {}
+    for recipe_id, recipe_features in features.items():
+        for feature in recipe_features:
+            postings.setdefault(feature, []).append(recipe_id)
+    limit = max(min_df, int(max_df * len(features)))
+    rare, common = {}, {}
+    for feature, recipe_ids in postings.items():
+        if feature > 0 and len(recipe_ids) <= limit:
+            rare[feature] = recipe_ids
+        else:
+            common[feature] = recipe_ids[:fallback_size]
+    return rare, common
+
+
+def get_similar(recipe_id, features, postings, top, candidates):
+    """
+    Returns top (score, similar_recipe_id) by Jaccard similarity.
+    Exact similarity is calculated only for the recipes, which share
+    the most rare ingredients with the recipe. Recipes with fewer
+    than top such candidates also get candidates sharing
+    common ingredients or tags.
+    """
+    rare, common = postings
+    recipe_features = features[recipe_id]
+    shared = Counter()
+    for feature in recipe_features:
+        shared.update(rare.get(feature, ()))
+    del shared[recipe_id]
+    if len(shared) < top:
+        for feature in recipe_features:
+            shared.update(common.get(feature, ()))
+        del shared[recipe_id]
+    scores = []
+    for other_id, _ in shared.most_common(candidates):
+        other_features = features[other_id]
+        intersection = len(recipe_features & other_features)
+        union = len(recipe_features) + len(other_features) - intersection
+        scores.append((intersection / union, other_id))
+    return heapq.nlargest(top, scores)
+
+
+def compute_similar_recipes(top=10, max_df=0.02, min_df=100,
+                            candidates=200, batch_size=1000, progress=None):
+    """
+    Recomputes SimilarRecipe table for all recipes.
+    Memory is linear in the number of recipe features,
+    results are written batch by batch.
+    Returns the number of processed recipes.
+    """
+    features = load_features()
+    postings = build_postings(features, max_df, min_df, candidates)
+    recipe_ids = sorted(features)
+    for start in range(0, len(recipe_ids), batch_size):
+        batch = recipe_ids[start:start + batch_size]
+        rows = [
+            SimilarRecipe(recipe_id=recipe_id, similar_id=other_id,
+                          score=score)
+            for recipe_id in batch
+            for score, other_id in get_similar(
+                recipe_id, features, postings, top, candidates
+            )
+        ]
+        with transaction.atomic():
+            SimilarRecipe.objects.filter(recipe_id__in=batch).delete()
+            SimilarRecipe.objects.bulk_create(rows, batch_size=batch_size)
+        if progress is not None:
+            progress(start + len(batch), len(recipe_ids))
+    SimilarRecipe.objects.exclude(recipe_id__in=features.keys()).delete()
+    return len(recipe_ids)
@@ -0,0 +1,37 @@
+from collections import defaultdict
+
+from django.db.models import F
+
+from .bitmask import get_mask
+from .models import Recipe, TagsInRecipe
+
+
+def get_tags_mask(tags):
+    """Returns Recipe.tags_mask value for the tags."""
+    return get_mask(tag.bit for tag in tags)
+
+
+def update_tags_mask(recipe_ids):
+    """
+    Recomputes tags_mask of the recipes from TagsInRecipe,
+    with one UPDATE per distinct mask.
+    """
+    recipe_ids = set(recipe_ids)
+    masks = defaultdict(int)
+    rows = TagsInRecipe.objects.filter(
+        recipe_id__in=recipe_ids
+    ).values_list('recipe_id', 'tag__bit')
+    for recipe_id, bit in rows:
+        masks[recipe_id] |= 1 << bit
+    recipes_by_mask = defaultdict(list)
+    for recipe_id in recipe_ids:
+        recipes_by_mask[masks[recipe_id]].append(recipe_id)
+    for mask, ids in recipes_by_mask.items():
+        Recipe.objects.filter(id__in=ids).update(tags_mask=mask)
+
+
+def remove_tag_from_masks(tag):
+    bit = 1 << tag.bit
+    Recipe.objects.filter(tags_mask__has_any=bit).update(
+        tags_mask=F('tags_mask').bitand(~bit)
+    )
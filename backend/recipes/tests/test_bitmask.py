@@ -0,0 +1,47 @@
+import importlib
+from unittest import mock
+
+from django.apps import apps
+from django.test import TestCase
+
+from recipes.models import Recipe, Tag
+
+from .utils import (create_ingredients, create_recipe, create_tags,
+                    create_user, get_client)
+
+tags_mask = importlib.import_module('recipes.migrations.0009_tags_mask')
+
+
+@mock.patch('recipes.bitmask.MAX_BITS', 3)
+class TagBitsTests(TestCase):
+
+    def test_lowest_free_bit_is_taken(self):
+        tags = create_tags(3)
+        self.assertEqual([tag.bit for tag in tags], [0, 1, 2])
+        tags[1].delete()
+        tag = Tag.objects.create(name='Новый', color=Tag.BROWN, slug='new')
+        self.assertEqual(tag.bit, 1)
+
+    def test_limit(self):
+        create_tags(3)
+        with self.assertRaises(ValueError):
+            Tag.objects.create(name='Лишний', color=Tag.BROWN, slug='extra')
+
+    def test_migration_fills_masks(self):
+        tags = create_tags(3)
+        recipe_id = create_recipe(
+            get_client(create_user('author')), [tags[0], tags[2]],
+            [(ingredient, 1) for ingredient in create_ingredients('г')]
+        )
+        Recipe.objects.update(tags_mask=0)
+        tags_mask.fill_masks(apps, None)
+        self.assertEqual(
+            list(Tag.objects.values_list('bit', flat=True)), [0, 1, 2]
+        )
+        self.assertEqual(Recipe.objects.get(id=recipe_id).tags_mask, 0b101)
+
+    def test_migration_fails_on_too_many_tags(self):
+        create_tags(3)
+        with mock.patch('recipes.bitmask.MAX_BITS', 2):
+            with self.assertRaisesMessage(ValueError, 'up to 2 tags'):
+                tags_mask.fill_masks(apps, None)
@@ -0,0 +1,101 @@
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+
+from recipes.cards import refresh_cards
+from recipes.models import Favorite, Recipe, RecipeCard, ShoppingCart
+from users.models import Follow
+
+from .utils import (create_ingredients, create_recipe, create_tags,
+                    create_user, get_client)
+
+
+class FastSerializationParityTests(TestCase):
+    """
+    Checks that the fast path returns the same bytes as serializers.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.authors = [create_user(f'author{number}') for number in range(2)]
+        cls.user = create_user('reader')
+        tags = create_tags(2)
+        ingredients = create_ingredients('г', 'шт', 'по вкусу')
+        cls.recipe_ids = [
+            create_recipe(
+                get_client(author), tags[:number % 2 + 1],
+                [(ingredient, number + 1)
+                 for ingredient in ingredients[number % 3:]],
+                name=f'{dish} {number}'
+            )
+            for number, (author, dish) in enumerate(
+                (author, dish) for dish in ('Борщ', 'Пирог')
+                for author in cls.authors
+            )
+        ]
+        Follow.objects.create(user=cls.user, author=cls.authors[0])
+        Follow.objects.create(user=cls.authors[1], author=cls.user)
+        Favorite.objects.create(user=cls.user, recipe_id=cls.recipe_ids[0])
+        ShoppingCart.objects.create(user=cls.user,
+                                    recipe_id=cls.recipe_ids[1])
+
+    def setUp(self):
+        cache.clear()
+
+    def assertSameOutput(self, client, *urls):
+        for url in urls:
+            with self.subTest(url=url):
+                responses = []
+                for fast in (False, True):
+                    with override_settings(FAST_SERIALIZATION=fast):
+                        responses.append(client.get(url))
+                slow, fast = responses
+                self.assertEqual(slow.status_code, 200)
+                self.assertEqual(fast.status_code, 200)
+                self.assertEqual(slow.content, fast.content)
+
+    def test_anonymous(self):
+        self.assertSameOutput(
+            get_client(),
+            '/api/recipes/',
+            f'/api/recipes/{self.recipe_ids[0]}/',
+            '/api/tags/',
+            '/api/ingredients/',
+            '/api/ingredients/?name=ингр',
+        )
+
+    def test_subscribed(self):
+        self.assertSameOutput(
+            get_client(self.user),
+            '/api/recipes/',
+            '/api/recipes/?page=2&limit=3',
+            f'/api/recipes/{self.recipe_ids[0]}/',
+            f'/api/recipes/{self.recipe_ids[1]}/',
+            '/api/recipes/timeline/',
+            '/api/users/subscriptions/',
+        )
+
+    def test_followed_back(self):
+        self.assertSameOutput(
+            get_client(self.authors[1]), '/api/users/subscriptions/'
+        )
+
+    def test_empty_image(self):
+        Recipe.objects.filter(id=self.recipe_ids[0]).update(image='')
+        refresh_cards([self.recipe_ids[0]])
+        self.assertSameOutput(
+            get_client(self.user),
+            '/api/recipes/',
+            f'/api/recipes/{self.recipe_ids[0]}/',
+            '/api/users/subscriptions/',
+        )
+
+    def test_missing_cards(self):
+        RecipeCard.objects.filter(recipe_id__in=self.recipe_ids[:2]).delete()
+        self.assertSameOutput(get_client(self.user), '/api/recipes/')
+
+    def test_search_annotated(self):
+        self.assertSameOutput(
+            get_client(self.user),
+            '/api/recipes/?search=борщ',
+            '/api/recipes/?search=пир&tags=tag0',
+        )
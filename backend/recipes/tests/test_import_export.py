@@ -0,0 +1,96 @@
+import datetime as dt
+import os
+import tempfile
+from unittest import mock
+
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from recipes.models import Recipe, TimelineEntry
+from users.models import Follow
+
+from .test_ingredient_index import IndexAssertionsMixin
+from .utils import (create_ingredients, create_recipe, create_tags,
+                    create_user, get_client)
+
+
+class ImportExportTests(IndexAssertionsMixin, TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = create_user('author')
+        cls.follower = create_user('follower')
+        Follow.objects.create(user=cls.follower, author=cls.author)
+        tags = create_tags(1)
+        ingredients = [(ingredient, 10) for ingredient in create_ingredients(
+            'г', 'шт'
+        )]
+        for number in range(3):
+            create_recipe(get_client(cls.author), tags, ingredients,
+                          name=f'Рецепт {number}')
+        start = timezone.now() - dt.timedelta(days=30)
+        for number, recipe in enumerate(Recipe.objects.order_by('id')):
+            recipe.pub_date = start + dt.timedelta(days=number)
+            recipe.save(update_fields=['pub_date'])
+        cls.pub_dates = dict(Recipe.objects.values_list('name', 'pub_date'))
+
+    def setUp(self):
+        cache.clear()
+
+    def export_and_import(self, **import_settings):
+        with tempfile.TemporaryDirectory() as path:
+            call_command('export_recipes', path, stdout=None)
+            Recipe.objects.all().delete()
+            with override_settings(**import_settings):
+                call_command('import_recipes', path, '--batch-size', '2',
+                             stdout=None, stderr=None)
+
+    def test_ingredient_index(self):
+        self.export_and_import()
+        index = self.get_index()
+        self.assertEqual(
+            sum(len(recipe_ids) for recipe_ids, _ in index.values()), 6
+        )
+        self.assert_index_is_consistent()
+
+    def test_images_of_failed_batch_are_deleted(self):
+        media = tempfile.TemporaryDirectory()
+        self.addCleanup(media.cleanup)
+        with mock.patch(
+            'recipes.management.commands.import_recipes.'
+            'add_to_ingredient_index',
+            side_effect=[None, RuntimeError]
+        ), self.assertRaises(RuntimeError):
+            self.export_and_import(MEDIA_ROOT=media.name)
+        images = os.listdir(os.path.join(media.name, 'recipes', 'images'))
+        self.assertEqual(len(images), 2)
+        self.assertEqual(
+            sorted(f'recipes/images/{name}' for name in images),
+            sorted(Recipe.objects.values_list('image', flat=True))
+        )
+
+    def test_pub_dates_are_restored(self):
+        self.export_and_import()
+        self.assertEqual(
+            dict(Recipe.objects.values_list('name', 'pub_date')),
+            self.pub_dates
+        )
+
+    def test_timelines_of_followers(self):
+        self.export_and_import()
+        self.assertEqual(
+            set(TimelineEntry.objects.values_list(
+                'user_id', 'recipe__name', 'author_id', 'pub_date'
+            )),
+            {
+                (self.follower.id, name, self.author.id, pub_date)
+                for name, pub_date in self.pub_dates.items()
+            }
+        )
+
+    @override_settings(TIMELINE_FANOUT_LIMIT=0)
+    def test_popular_authors_are_not_fanned_out(self):
+        self.export_and_import()
+        self.assertFalse(TimelineEntry.objects.exists())
@@ -0,0 +1,169 @@
+import base64
+from unittest import mock
+
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import TestCase
+
+from recipes.ingredient_index import (decode_postings, find_recipes,
+                                      rebuild_ingredient_index)
+from recipes.models import IngredientIndex, IngredientInRecipe, Recipe
+
+from .utils import (create_ingredients, create_recipe, create_tags,
+                    create_user, get_client, get_image)
+
+
+class IndexAssertionsMixin:
+
+    def get_index(self):
+        """Returns {ingredient_id: (recipe_ids, sizes)} of all chunks."""
+        index = {}
+        rows = IngredientIndex.objects.order_by('ingredient_id', 'chunk')
+        for row in rows:
+            recipe_ids, sizes = decode_postings(row.recipes, row.chunk)
+            self.assertTrue(recipe_ids, 'empty chunks are deleted')
+            postings = index.setdefault(row.ingredient_id, ([], []))
+            postings[0].extend(recipe_ids)
+            postings[1].extend(sizes)
+        return index
+
+    def assert_index_is_consistent(self):
+        index = self.get_index()
+        rebuild_ingredient_index()
+        self.assertEqual(index, self.get_index())
+
+
+class IngredientIndexAdminTests(IndexAssertionsMixin, TestCase):
+    """Checks that admin writes keep the index equal to a rebuild."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = create_user('admin', is_staff=True, is_superuser=True)
+        cls.tags = create_tags(1)
+        cls.ingredients = create_ingredients('г', 'мл', 'шт')
+        flour, milk, _ = cls.ingredients
+        cls.recipe_id = create_recipe(
+            get_client(cls.admin), cls.tags, [(flour, 100), (milk, 200)]
+        )
+
+    def setUp(self):
+        self.client.force_login(self.admin)
+
+    def test_recipe_added_in_admin(self):
+        _, milk, eggs = self.ingredients
+        image = get_image().split(',')[1]
+        response = self.client.post('/admin/recipes/recipe/add/', {
+            'author': self.admin.id,
+            'name': 'Омлет',
+            'text': 'Взбить',
+            'cooking_time': 5,
+            'image': SimpleUploadedFile(
+                'omelette.png', base64.b64decode(image), 'image/png'
+            ),
+            'ingredientinrecipe_set-TOTAL_FORMS': 2,
+            'ingredientinrecipe_set-INITIAL_FORMS': 0,
+            'ingredientinrecipe_set-0-ingredient': milk.id,
+            'ingredientinrecipe_set-0-amount': 100,
+            'ingredientinrecipe_set-1-ingredient': eggs.id,
+            'ingredientinrecipe_set-1-amount': 2,
+            'tagsinrecipe_set-TOTAL_FORMS': 0,
+            'tagsinrecipe_set-INITIAL_FORMS': 0,
+        })
+        self.assertEqual(response.status_code, 302)
+        self.assertEqual(Recipe.objects.count(), 2)
+        self.assert_index_is_consistent()
+
+    def test_link_changed_in_admin(self):
+        link = IngredientInRecipe.objects.filter(
+            recipe_id=self.recipe_id
+        ).first()
+        response = self.client.post(
+            f'/admin/recipes/ingredientinrecipe/{link.id}/change/', {
+                'ingredient': self.ingredients[2].id,
+                'recipe': self.recipe_id,
+                'amount': 3,
+            }
+        )
+        self.assertEqual(response.status_code, 302)
+        self.assert_index_is_consistent()
+
+    def test_link_deleted_in_admin(self):
+        link = IngredientInRecipe.objects.filter(
+            recipe_id=self.recipe_id
+        ).first()
+        response = self.client.post(
+            f'/admin/recipes/ingredientinrecipe/{link.id}/delete/',
+            {'post': 'yes'}
+        )
+        self.assertEqual(response.status_code, 302)
+        self.assert_index_is_consistent()
+
+
+class ChunkedIngredientIndexTests(IndexAssertionsMixin, TestCase):
+    """Checks the index, which spans several chunks."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = create_user('author')
+        cls.tags = create_tags(1)
+        cls.ingredients = create_ingredients('г', 'мл', 'шт', 'ст. л.')
+        cls.recipe_ids = [
+            create_recipe(
+                get_client(cls.author), cls.tags,
+                [(ingredient, 1) for ingredient in cls.ingredients[
+                    number % 2:number % 3 + 2
+                ]],
+                name=f'Рецепт {number}'
+            )
+            for number in range(12)
+        ]
+
+    def setUp(self):
+        chunk_span = mock.patch('recipes.ingredient_index.CHUNK_SPAN', 4)
+        chunk_span.start()
+        self.addCleanup(chunk_span.stop)
+        rebuild_ingredient_index()
+        self.client = get_client(self.author)
+
+    def test_rows_are_chunked(self):
+        self.assertGreater(
+            IngredientIndex.objects.filter(
+                ingredient=self.ingredients[1]
+            ).count(),
+            1
+        )
+
+    def test_updates_keep_index_consistent(self):
+        flour, milk, eggs, _ = self.ingredients
+        new_id = create_recipe(
+            self.client, self.tags, [(flour, 1), (eggs, 1)]
+        )
+        response = self.client.patch(
+            f'/api/recipes/{self.recipe_ids[5]}/', {
+                'name': 'Новый', 'text': 'Текст', 'cooking_time': 1,
+                'tags': [self.tags[0].id],
+                'ingredients': [{'id': milk.id, 'amount': 1}],
+            }, format='json'
+        )
+        self.assertEqual(response.status_code, 200)
+        for recipe_id in (self.recipe_ids[0], new_id):
+            response = self.client.delete(f'/api/recipes/{recipe_id}/')
+            self.assertEqual(response.status_code, 204)
+        self.assert_index_is_consistent()
+
+    def test_cook_with_pages(self):
+        """Pages of the heap selection follow the full sort."""
+        url = '/api/recipes/cook_with/?ingredients={}&ingredients={}' \
+              '&max_missing=2&limit=5&page={}'
+        found = find_recipes([pk.id for pk in self.ingredients[:2]], 2)
+        expected = [recipe_id for recipe_id, *_ in sorted(
+            found.found, key=lambda item: (-item[1], item[2], -item[0])
+        )]
+        self.assertEqual(len(expected), len(self.recipe_ids))
+        pages = []
+        for page in (1, 2, 3):
+            response = self.client.get(url.format(
+                self.ingredients[0].id, self.ingredients[1].id, page
+            ))
+            self.assertEqual(response.data['count'], len(expected))
+            pages.extend(recipe['id'] for recipe in response.data['results'])
+        self.assertEqual(pages, expected)
@@ -0,0 +1,81 @@
+from django.test import TestCase
+from rest_framework.test import APIRequestFactory, force_authenticate
+
+from recipes.models import ShoppingCart
+from recipes.relations import create_relation, insert_relations
+from recipes.shopping_list import add_to_shopping_list
+from recipes.views import BulkShoppingCartViewSet
+
+from .test_shopping_list import ShoppingListAssertionsMixin
+from .utils import (create_ingredients, create_recipe, create_tags,
+                    create_user, get_client)
+
+
+class ConcurrentBulkShoppingCartView(BulkShoppingCartViewSet):
+    """Adds the first recipe to the cart after the cart is read."""
+
+    def check_target(self, request, target_id):
+        if create_relation(ShoppingCart, user=request.user,
+                           recipe_id=target_id):
+            add_to_shopping_list(request.user.id, [target_id])
+        return None
+
+
+class BulkRelationTests(ShoppingListAssertionsMixin, TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = create_user('user')
+        client = get_client(cls.user)
+        tags = create_tags(1)
+        flour, milk = create_ingredients('г', 'мл')
+        cls.recipes = [
+            create_recipe(client, tags, [(flour, 100), (milk, 200)]),
+            create_recipe(client, tags, [(flour, 50)]),
+        ]
+
+    def setUp(self):
+        self.client = get_client(self.user)
+
+    def post(self, data):
+        response = self.client.post(
+            '/api/recipes/shopping_cart/bulk/', data, format='json'
+        )
+        self.assertEqual(response.status_code, 200)
+        return [item['status'] for item in response.data['results']]
+
+    def test_statuses(self):
+        first, second = self.recipes
+        self.client.get(f'/api/recipes/{first}/shopping_cart/')
+        self.assertEqual(
+            self.post({'add': [first, second, 10 ** 6]}),
+            ['exists', 'created', 'not_found']
+        )
+        self.assertEqual(
+            self.post({'remove': [first, 10 ** 6]}),
+            ['deleted', 'not_found']
+        )
+        self.assert_shopping_list_is_consistent()
+
+    def test_concurrent_add_is_not_counted_twice(self):
+        request = APIRequestFactory().post(
+            '/api/recipes/shopping_cart/bulk/',
+            {'add': self.recipes}, format='json'
+        )
+        force_authenticate(request, self.user)
+        response = ConcurrentBulkShoppingCartView.as_view()(request)
+        self.assertEqual(
+            [item['status'] for item in response.data['results']],
+            ['exists', 'exists']
+        )
+        self.assert_shopping_list_is_consistent()
+
+    def test_insert_relations_returns_inserted_rows(self):
+        first, second = self.recipes
+        ShoppingCart.objects.create(user=self.user, recipe_id=first)
+        inserted = insert_relations(ShoppingCart, [
+            ShoppingCart(user=self.user, recipe_id=recipe_id)
+            for recipe_id in self.recipes
+        ], 'recipe')
+        self.assertEqual(inserted, [second])
+        self.assertEqual(ShoppingCart.objects.count(), 2)
@@ -0,0 +1,49 @@
+from unittest import mock
+
+from django.test import TestCase, override_settings
+
+from recipes.permissions import AdminOrAuthorOrReadOnly
+
+from .utils import (create_ingredients, create_recipe, create_tags,
+                    create_user, get_client)
+
+
+class RecipeRetrieveTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = create_user('author')
+        cls.recipe_id = create_recipe(
+            get_client(cls.author), create_tags(1),
+            [(ingredient, 10) for ingredient in create_ingredients('г')]
+        )
+
+    def setUp(self):
+        self.client = get_client(create_user('reader'))
+
+    def get_statuses(self, url):
+        """Returns statuses of the fast and the serializer path."""
+        statuses = [self.client.get(url).status_code]
+        with override_settings(FAST_SERIALIZATION=False):
+            statuses.append(self.client.get(url).status_code)
+        return statuses
+
+    def test_found(self):
+        self.assertEqual(
+            self.get_statuses(f'/api/recipes/{self.recipe_id}/'), [200, 200]
+        )
+
+    def test_not_found(self):
+        for pk in ('abc', self.recipe_id + 1):
+            with self.subTest(pk=pk):
+                self.assertEqual(
+                    self.get_statuses(f'/api/recipes/{pk}/'), [404, 404]
+                )
+
+    def test_object_permissions_are_checked(self):
+        with mock.patch.object(AdminOrAuthorOrReadOnly,
+                               'has_object_permission', return_value=False):
+            self.assertEqual(
+                self.get_statuses(f'/api/recipes/{self.recipe_id}/'),
+                [403, 403]
+            )
@@ -0,0 +1,99 @@
+from django.test import TestCase
+
+from recipes.models import ShoppingListItem
+from recipes.shopping_list import rebuild_shopping_lists
+
+from .utils import (create_ingredients, create_recipe, create_tags,
+                    create_user, get_client)
+
+
+class ShoppingListAssertionsMixin:
+
+    def get_items(self):
+        return sorted(ShoppingListItem.objects.values_list(
+            'user_id', 'ingredient_id', 'amount', 'amounts_count',
+            'recipes_count'
+        ))
+
+    def assert_shopping_list_is_consistent(self):
+        """Checks that incremental updates are equal to a rebuild."""
+        items = self.get_items()
+        rebuild_shopping_lists()
+        self.assertEqual(items, self.get_items())
+
+
+class ShoppingListTests(ShoppingListAssertionsMixin, TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = create_user('author')
+        cls.users = [create_user(f'user{number}') for number in range(2)]
+        cls.tags = create_tags(1)
+        cls.ingredients = create_ingredients('г', 'мл', 'шт', 'кг')
+        flour, milk, eggs, _ = cls.ingredients
+        client = get_client(cls.author)
+        cls.pancakes = create_recipe(
+            client, cls.tags, [(flour, 200), (milk, 500), (eggs, 2)]
+        )
+        cls.omelette = create_recipe(client, cls.tags, [(milk, 100),
+                                                        (eggs, 3)])
+
+    def setUp(self):
+        self.clients = [get_client(user) for user in self.users]
+        for client in self.clients:
+            for recipe_id in (self.pancakes, self.omelette):
+                response = client.get(
+                    f'/api/recipes/{recipe_id}/shopping_cart/'
+                )
+                self.assertEqual(response.status_code, 201)
+        self.assertTrue(self.get_items())
+
+    def test_single_cart_endpoint(self):
+        first, second = self.clients
+        url = f'/api/recipes/{self.pancakes}/shopping_cart/'
+        self.assertEqual(first.get(url).status_code, 400)
+        self.assert_shopping_list_is_consistent()
+        self.assertEqual(first.delete(url).status_code, 204)
+        self.assertEqual(first.delete(url).status_code, 400)
+        self.assert_shopping_list_is_consistent()
+        url = f'/api/recipes/{self.omelette}/shopping_cart/'
+        self.assertEqual(second.delete(url).status_code, 204)
+        self.assertEqual(second.get(url).status_code, 201)
+        self.assert_shopping_list_is_consistent()
+
+    def test_recipe_ingredients_update(self):
+        flour, milk, _, sugar = self.ingredients
+        response = get_client(self.author).patch(
+            f'/api/recipes/{self.pancakes}/', {
+                'name': 'Блины',
+                'text': 'Смешать',
+                'cooking_time': 20,
+                'tags': [self.tags[0].id],
+                'ingredients': [
+                    {'id': flour.id, 'amount': 300},
+                    {'id': milk.id, 'amount': 400},
+                    {'id': sugar.id, 'amount': 1},
+                ],
+            }, format='json'
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assert_shopping_list_is_consistent()
+
+    def test_recipe_delete(self):
+        response = get_client(self.author).delete(
+            f'/api/recipes/{self.pancakes}/'
+        )
+        self.assertEqual(response.status_code, 204)
+        self.assert_shopping_list_is_consistent()
+        self.assertFalse(ShoppingListItem.objects.filter(
+            ingredient=self.ingredients[0]
+        ).exists())
+
+    def test_text_download(self):
+        response = self.clients[0].get(
+            '/api/recipes/download_shopping_cart/', {'format': 'txt'}
+        )
+        self.assertEqual(response.status_code, 200)
+        lines = b''.join(response.streaming_content).decode().splitlines()
+        self.assertEqual(len(lines), 3)
+        self.assertIn(f'{self.ingredients[0].name} (г) - 200', lines)
@@ -0,0 +1,74 @@
+import random
+
+from django.test import TestCase
+
+from recipes.models import (IngredientInRecipe, Recipe, SimilarRecipe,
+                            TagsInRecipe)
+from recipes.similarity import compute_similar_recipes
+
+from .utils import create_ingredients, create_tags, create_user, get_client
+
+# Django 3.0 doesn't limit explicit batch size by SQLite variables limit
+BATCH_SIZE = 50
+
+
+class SimilarRecipesTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = create_user('author')
+        cls.tags = create_tags(3)
+        cls.ingredients = create_ingredients(*['г'] * 20)
+        Recipe.objects.bulk_create(
+            Recipe(author=cls.author, name=f'Рецепт {number}', text='-',
+                   cooking_time=10, image='recipes/images/recipe.png')
+            for number in range(300)
+        )
+        cls.recipes = list(Recipe.objects.order_by('id'))
+        generator = random.Random(1)
+        IngredientInRecipe.objects.bulk_create(
+            IngredientInRecipe(recipe=recipe, ingredient=ingredient, amount=1)
+            for recipe in cls.recipes[1:]
+            for ingredient in generator.sample(cls.ingredients, 5)
+        )
+        TagsInRecipe.objects.bulk_create(
+            TagsInRecipe(recipe=recipe, tag=generator.choice(cls.tags))
+            for recipe in cls.recipes
+        )
+
+    def get_recipes_without_similar(self):
+        return Recipe.objects.exclude(
+            id__in=SimilarRecipe.objects.values('recipe_id')
+        ).count()
+
+    def test_common_ingredients_are_kept_in_small_catalogue(self):
+        compute_similar_recipes(top=5, batch_size=BATCH_SIZE)
+        self.assertEqual(self.get_recipes_without_similar(), 0)
+
+    def test_fallback_to_common_ingredients_and_tags(self):
+        compute_similar_recipes(
+            top=5, min_df=1, batch_size=BATCH_SIZE
+        )
+        self.assertEqual(self.get_recipes_without_similar(), 0)
+        # the first recipe has only a tag
+        self.assertEqual(
+            SimilarRecipe.objects.filter(recipe=self.recipes[0]).count(), 5
+        )
+
+    def test_endpoint(self):
+        compute_similar_recipes(top=5, batch_size=BATCH_SIZE)
+        recipe = self.recipes[1]
+        response = get_client().get(f'/api/recipes/{recipe.id}/similar/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            [item['id'] for item in response.data],
+            list(SimilarRecipe.objects.filter(
+                recipe=recipe
+            ).values_list('similar_id', flat=True))
+        )
+
+    def test_endpoint_not_found(self):
+        client = get_client()
+        for pk in ('abc', Recipe.objects.order_by('-id')[0].id + 1):
+            response = client.get(f'/api/recipes/{pk}/similar/')
+            self.assertEqual(response.status_code, 404)
@@ -0,0 +1,17 @@
+from io import StringIO
+
+from django.core.management import CommandError, call_command
+from django.test import SimpleTestCase
+
+
+class StartupImportsTests(SimpleTestCase):
+
+    def test_reportlab_is_not_imported_on_startup(self):
+        output = StringIO()
+        call_command('check_startup_imports', stdout=output)
+        self.assertIn('No forbidden modules imported', output.getvalue())
+
+    def test_forbidden_module_fails(self):
+        with self.assertRaisesMessage(CommandError, 'rest_framework'):
+            call_command('check_startup_imports',
+                         '--forbid', 'rest_framework', stdout=StringIO())
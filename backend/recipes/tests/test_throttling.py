@@ -0,0 +1,105 @@
+from types import SimpleNamespace
+
+from django.contrib.auth.models import AnonymousUser
+from django.core.cache import cache
+from django.test import TestCase
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory
+
+from recipes.throttling import (IPSlidingWindowThrottle,
+                                UserSlidingWindowThrottle)
+
+from .utils import create_user
+
+RATES = {'write_user': '10/min', 'write_ip': '15/min'}
+VIEW = SimpleNamespace(throttle_scope='write')
+# start of a window, so windows are [START, START + 60) and so on
+START = 60 * 1000
+
+
+class SlidingWindowThrottleTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.users = [create_user(f'user{number}') for number in range(2)]
+
+    def setUp(self):
+        cache.clear()
+
+    def get_request(self, user=None, ip='10.0.0.1'):
+        request = Request(APIRequestFactory().post('/', REMOTE_ADDR=ip))
+        request.user = user or AnonymousUser()
+        return request
+
+    def check(self, request, now, throttle_class=UserSlidingWindowThrottle):
+        """Returns the throttle after a check of the request at now."""
+        throttle = throttle_class()
+        throttle.THROTTLE_RATES = RATES
+        throttle.timer = lambda: now
+        throttle.allowed = throttle.allow_request(request, VIEW)
+        return throttle
+
+    def send(self, request, count, now, **kwargs):
+        return [self.check(request, now, **kwargs).allowed
+                for _ in range(count)]
+
+    def test_limit_within_window(self):
+        request = self.get_request(self.users[0])
+        self.assertEqual(
+            self.send(request, 11, START + 10), [True] * 10 + [False]
+        )
+        throttle = self.check(request, START + 10)
+        self.assertFalse(throttle.allowed)
+        self.assertEqual(throttle.wait(), 50)
+
+    def test_views_without_scope_or_rate(self):
+        request = self.get_request(self.users[0])
+        for scope in (None, 'download'):
+            throttle = UserSlidingWindowThrottle()
+            throttle.THROTTLE_RATES = RATES
+            self.assertTrue(throttle.allow_request(
+                request, SimpleNamespace(throttle_scope=scope)
+            ))
+
+    def test_window_rollover(self):
+        request = self.get_request(self.users[0])
+        self.send(request, 10, START + 50)
+        # half of the previous window is still inside the sliding one
+        self.assertEqual(
+            self.send(request, 6, START + 90), [True] * 5 + [False]
+        )
+        self.assertTrue(all(self.send(request, 10, START + 180)))
+
+    def test_wait_after_rollover(self):
+        request = self.get_request(self.users[0])
+        self.send(request, 10, START + 50)
+        self.send(request, 5, START + 90)
+        throttle = self.check(request, START + 90)
+        self.assertFalse(throttle.allowed)
+        # the retry is the 7th request: 7 + 10 * (1 - 42 / 60) <= 10
+        self.assertAlmostEqual(throttle.wait(), 12)
+        self.assertTrue(self.check(request, START + 102).allowed)
+
+    def test_users_are_counted_separately(self):
+        first, second = (self.get_request(user) for user in self.users)
+        self.send(first, 10, START)
+        self.assertFalse(self.check(first, START).allowed)
+        self.assertTrue(self.check(second, START).allowed)
+
+    def test_anonymous_users_are_counted_per_ip(self):
+        self.send(self.get_request(ip='10.0.0.1'), 10, START)
+        self.assertFalse(self.check(self.get_request(), START).allowed)
+        self.assertTrue(
+            self.check(self.get_request(ip='10.0.0.2'), START).allowed
+        )
+
+    def test_users_share_ip_scope(self):
+        first, second = (self.get_request(user) for user in self.users)
+        kwargs = {'throttle_class': IPSlidingWindowThrottle}
+        self.assertTrue(all(self.send(first, 10, START, **kwargs)))
+        self.assertEqual(
+            self.send(second, 6, START, **kwargs), [True] * 5 + [False]
+        )
+        self.assertTrue(self.check(
+            self.get_request(self.users[0], ip='10.0.0.2'), START, **kwargs
+        ).allowed)
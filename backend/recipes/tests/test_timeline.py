@@ -0,0 +1,168 @@
+from unittest import mock
+
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+
+from recipes.models import Recipe, TimelineEntry
+from users.models import Follow
+
+from .utils import (create_ingredients, create_recipe, create_tags,
+                    create_user, get_client)
+
+
+class TimelineTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = create_user('reader')
+        cls.authors = [create_user(f'author{number}') for number in range(2)]
+        Follow.objects.bulk_create(
+            Follow(user=cls.user, author=author) for author in cls.authors
+        )
+        cls.tags = create_tags(2)
+        cls.ingredients = create_ingredients('г', 'шт')
+
+    def setUp(self):
+        cache.clear()
+        self.client = get_client(self.user)
+
+    def create_recipes(self, count):
+        """Creates recipes of both authors, returns ids newest first."""
+        recipe_ids = [
+            create_recipe(
+                get_client(self.authors[number % 2]), self.tags,
+                [(ingredient, 10) for ingredient in self.ingredients],
+                name=f'Рецепт {number}'
+            )
+            for number in range(count)
+        ]
+        return recipe_ids[::-1]
+
+    def get_timeline(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get('/api/recipes/timeline/')
+        self.assertEqual(response.status_code, 200)
+        return response.data, len(queries)
+
+    def test_queries_do_not_depend_on_page_size(self):
+        self.create_recipes(2)
+        cache.clear()
+        _, few = self.get_timeline()
+        self.create_recipes(4)
+        cache.clear()
+        _, more = self.get_timeline()
+        self.assertEqual(few, more)
+        self.assertLessEqual(more, 10)
+
+    def test_order_and_representation(self):
+        recipe_ids = self.create_recipes(4)
+        self.client.post(f'/api/recipes/{recipe_ids[1]}/favorite/')
+        data, _ = self.get_timeline()
+        self.assertEqual(data['count'], 4)
+        self.assertEqual(
+            [recipe['id'] for recipe in data['results']], recipe_ids
+        )
+        for recipe in data['results']:
+            self.assertEqual(
+                recipe,
+                self.client.get(f'/api/recipes/{recipe["id"]}/').data
+            )
+
+    @override_settings(TIMELINE_FANOUT_LIMIT=0)
+    def test_popular_authors_are_merged(self):
+        recipe_ids = self.create_recipes(4)
+        cache.clear()
+        data, _ = self.get_timeline()
+        self.assertEqual(
+            [recipe['id'] for recipe in data['results']], recipe_ids
+        )
+
+    def test_fieldsets(self):
+        recipe_ids = self.create_recipes(2)
+        response = self.client.get('/api/recipes/timeline/?fields=id,name')
+        self.assertEqual(response.data['results'], [
+            {'id': recipe_id, 'name': f'Рецепт {number}'}
+            for number, recipe_id in zip((1, 0), recipe_ids)
+        ])
+
+
+class FollowTimelineTests(TestCase):
+    """Checks timeline entries of follows made in the API and admin."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = create_user('admin', is_staff=True, is_superuser=True)
+        cls.user = create_user('reader')
+        cls.authors = [create_user(f'author{number}') for number in range(2)]
+        tags = create_tags(1)
+        ingredients = [(ingredient, 10)
+                       for ingredient in create_ingredients('г')]
+        for author in cls.authors:
+            create_recipe(get_client(author), tags, ingredients,
+                          name=f'Рецепт {author.username}')
+
+    def setUp(self):
+        cache.clear()
+        self.client.force_login(self.admin)
+
+    def get_entries(self):
+        return set(TimelineEntry.objects.values_list('user_id', 'author_id'))
+
+    def test_follow_and_unfollow(self):
+        client = get_client(self.user)
+        author = self.authors[0]
+        url = f'/api/users/{author.id}/subscribe/'
+        self.assertEqual(client.get(url).status_code, 201)
+        self.assertEqual(self.get_entries(), {(self.user.id, author.id)})
+        self.assertEqual(client.delete(url).status_code, 204)
+        self.assertEqual(self.get_entries(), set())
+
+    def test_follow_is_rolled_back_with_failed_backfill(self):
+        url = f'/api/users/{self.authors[0].id}/subscribe/'
+        with mock.patch('users.views.backfill_timeline',
+                        side_effect=RuntimeError):
+            with self.assertRaises(RuntimeError):
+                get_client(self.user).get(url)
+        self.assertFalse(Follow.objects.exists())
+
+    def test_follow_changed_in_admin(self):
+        first, second = self.authors
+        response = self.client.post('/admin/users/follow/add/', {
+            'user': self.user.id,
+            'author': first.id,
+        })
+        self.assertEqual(response.status_code, 302)
+        self.assertEqual(self.get_entries(), {(self.user.id, first.id)})
+        follow = Follow.objects.get()
+        response = self.client.post(
+            f'/admin/users/follow/{follow.id}/change/', {
+                'user': self.user.id,
+                'author': second.id,
+            }
+        )
+        self.assertEqual(response.status_code, 302)
+        self.assertEqual(self.get_entries(), {(self.user.id, second.id)})
+
+    def test_follow_deleted_in_admin(self):
+        follows = [Follow.objects.create(user=self.user, author=author)
+                   for author in self.authors]
+        TimelineEntry.objects.bulk_create(
+            TimelineEntry(user=self.user, recipe=recipe, author=recipe.author,
+                          pub_date=recipe.pub_date)
+            for recipe in Recipe.objects.all()
+        )
+        response = self.client.post(
+            f'/admin/users/follow/{follows[0].id}/delete/', {'post': 'yes'}
+        )
+        self.assertEqual(response.status_code, 302)
+        self.assertEqual(self.get_entries(),
+                         {(self.user.id, self.authors[1].id)})
+        response = self.client.post('/admin/users/follow/', {
+            'action': 'delete_selected',
+            '_selected_action': [follows[1].id],
+            'post': 'yes',
+        })
+        self.assertEqual(response.status_code, 302)
+        self.assertEqual(self.get_entries(), set())
@@ -0,0 +1,72 @@
+import base64
+import io
+
+from django.contrib.auth import get_user_model
+from PIL import Image
+from rest_framework.test import APIClient
+
+from recipes.models import Ingredient, Tag
+
+User = get_user_model()
+
+
+def create_user(username, **fields):
+    return User.objects.create_user(
+        email=f'{username}@example.com', username=username,
+        first_name='Иван', last_name='Иванов', password='password',
+        **fields
+    )
+
+
+def get_client(user=None):
+    client = APIClient()
+    if user is not None:
+        client.force_authenticate(user)
+    return client
+
+
+def get_image():
+    output = io.BytesIO()
+    Image.new('RGB', (2, 2)).save(output, 'PNG')
+    return 'data:image/png;base64,' + base64.b64encode(
+        output.getvalue()
+    ).decode()
+
+
+def create_tags(count=2):
+    return [
+        Tag.objects.create(name=f'Тег {number}', color=color,
+                           slug=f'tag{number}')
+        for number, (color, _) in enumerate(Tag.COLOR_CHOICES[:count])
+    ]
+
+
+def create_ingredients(*units):
+    return [
+        Ingredient.objects.create(
+            name=f'Ингредиент {number}', measurement_unit=unit
+        )
+        for number, unit in enumerate(units)
+    ]
+
+
+def create_recipe(client, tags, ingredients, name='Рецепт', **fields):
+    """
+    Creates a recipe through the API, so all precomputed data
+    (cards, indexes, timelines) is updated as in production.
+    ingredients is a list of (ingredient, amount).
+    """
+    response = client.post('/api/recipes/', {
+        'name': name,
+        'text': 'Описание',
+        'cooking_time': 10,
+        'image': get_image(),
+        'tags': [tag.id for tag in tags],
+        'ingredients': [
+            {'id': ingredient.id, 'amount': amount}
+            for ingredient, amount in ingredients
+        ],
+        **fields,
+    }, format='json')
+    assert response.status_code == 201, response.data
+    return response.data['id']
@@ -0,0 +1,102 @@
+import time
+
+from django.core.cache import cache as default_cache
+from rest_framework.throttling import SimpleRateThrottle
+
+COUNT_BITS = 32
+COUNT_MASK = (1 << COUNT_BITS) - 1
+
+
+class SlidingWindowThrottle(SimpleRateThrottle):
+    """
+    Describes base throttle of views with `throttle_scope` attribute,
+    the rate is taken from DEFAULT_THROTTLE_RATES by
+    '<scope>_<rate_suffix>' key, views without scope or rate
+    are not throttled.
+    Requests are counted by a sliding window approximation:
+    requests of the current window plus requests of the previous one
+    weighted by the part of it that is still inside the window.
+    Both counts live in one cache value (previous count in the high
+    bits), so a check is a single cache.incr; the value is created
+    with cache.add only on the first request of a window.
+    """
+    cache = default_cache
+    cache_format = 'throttle_%(scope)s_%(ident)s_%(window)s'
+    rate_suffix = None
+
+    def __init__(self):
+        pass
+
+    def get_ident_key(self, request):
+        raise NotImplementedError
+
+    def get_window_key(self, ident, window):
+        return self.cache_format % {
+            'scope': self.scope, 'ident': ident, 'window': window
+        }
+
+    def allow_request(self, request, view):
+        scope = getattr(view, 'throttle_scope', None)
+        if not scope:
+            return True
+        self.scope = f'{scope}_{self.rate_suffix}'
+        self.rate = self.THROTTLE_RATES.get(self.scope)
+        if self.rate is None:
+            return True
+        self.num_requests, self.duration = self.parse_rate(self.rate)
+
+        self.now = self.timer()
+        window = int(self.now // self.duration)
+        ident = self.get_ident_key(request)
+        key = self.get_window_key(ident, window)
+        try:
+            value = self.cache.incr(key)
+        except ValueError:
+            value = self.start_window(ident, window, key)
+        self.previous = value >> COUNT_BITS
+        self.current = value & COUNT_MASK
+        self.elapsed = self.now - window * self.duration
+        weight = 1 - self.elapsed / self.duration
+        return self.current + self.previous * weight <= self.num_requests
+
+    def start_window(self, ident, window, key):
+        """Returns the counter of the new window with this request."""
+        previous = self.cache.get(self.get_window_key(ident, window - 1), 0)
+        value = ((previous & COUNT_MASK) << COUNT_BITS) + 1
+        if self.cache.add(key, value, self.duration * 2):
+            return value
+        return self.cache.incr(key)
+
+    def wait(self):
+        """
+        Returns seconds until the next request fits the rate,
+        denied requests are counted too, so the retry is included.
+        """
+        remaining = self.duration - self.elapsed
+        retry = self.current + 1
+        if retry > self.num_requests or not self.previous:
+            return remaining
+        part = (self.num_requests - retry) / self.previous
+        return max(0, min(remaining, self.duration * (1 - part)
+                          - self.elapsed))
+
+    def timer(self):
+        return time.time()
+
+
+class UserSlidingWindowThrottle(SlidingWindowThrottle):
+    """Counts requests per user, anonymous users are counted per IP."""
+    rate_suffix = 'user'
+
+    def get_ident_key(self, request):
+        if request.user and request.user.is_authenticated:
+            return request.user.pk
+        return self.get_ident(request)
+
+
+class IPSlidingWindowThrottle(SlidingWindowThrottle):
+    """Counts requests per client IP."""
+    rate_suffix = 'ip'
+
+    def get_ident_key(self, request):
+        return self.get_ident(request)
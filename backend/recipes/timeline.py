@@ -0,0 +1,131 @@
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Count
+
+from foodgram import metrics
+
+from users.models import Follow
+
+from .models import Recipe, TimelineEntry
+
+FOLLOWERS_CACHE_KEY = 'followers_count_%s'
+
+
+def get_followers_counts(author_ids):
+    """
+    Returns {author_id: followers count}.
+    Counts are cached, so popular authors are counted once per timeout.
+    """
+    keys = {author_id: FOLLOWERS_CACHE_KEY % author_id
+            for author_id in author_ids}
+    cached = cache.get_many(keys.values())
+    counts = {author_id: cached[key] for author_id, key in keys.items()
+              if key in cached}
+    missing = [author_id for author_id in keys if author_id not in counts]
+    metrics.inc('foodgram_cache_hits_total', len(counts),
+                cache='followers_counts')
+    metrics.inc('foodgram_cache_misses_total', len(missing),
+                cache='followers_counts')
+    if missing:
+        fresh = dict.fromkeys(missing, 0)
+        fresh.update(Follow.objects.filter(
+            author_id__in=missing
+        ).values_list('author_id').annotate(count=Count('id')).order_by())
+        cache.set_many(
+            {keys[author_id]: count for author_id, count in fresh.items()},
+            settings.TIMELINE_FOLLOWERS_CACHE_TIMEOUT
+        )
+        counts.update(fresh)
+    return counts
+
+
+def split_popular(author_ids):
+    """
+    Splits authors into normal ones, whose recipes are written
+    to followers timelines, and popular ones, whose recipes
+    are merged into timelines at read time.
+    """
+    counts = get_followers_counts(author_ids)
+    normal, popular = [], []
+    for author_id in author_ids:
+        if counts[author_id] > settings.TIMELINE_FANOUT_LIMIT:
+            popular.append(author_id)
+        else:
+            normal.append(author_id)
+    return normal, popular
+
+
+def fan_out_recipe(recipe):
+    """Writes new recipe of normal author to timelines of followers."""
+    fan_out_recipes([recipe])
+
+
+def fan_out_recipes(recipes, batch_size=1000):
+    """
+    Writes recipes of normal authors to timelines of their followers,
+    recipes of popular authors are left for read time.
+    """
+    normal, _ = split_popular(list({recipe.author_id for recipe in recipes}))
+    if not normal:
+        return
+    followers = {}
+    for user_id, author_id in Follow.objects.filter(
+        author_id__in=normal
+    ).values_list('user_id', 'author_id'):
+        followers.setdefault(author_id, []).append(user_id)
+    TimelineEntry.objects.bulk_create(
+        [
+            TimelineEntry(user_id=user_id, recipe=recipe,
+                          author_id=recipe.author_id,
+                          pub_date=recipe.pub_date)
+            for recipe in recipes
+            for user_id in followers.get(recipe.author_id, ())
+        ],
+        batch_size=batch_size,
+        ignore_conflicts=True
+    )
+
+
+def backfill_timeline(user, author_ids):
+    """Adds latest recipes of newly followed normal authors."""
+    normal, _ = split_popular(list(author_ids))
+    entries = []
+    for author_id in normal:
+        recipes = Recipe.objects.filter(author_id=author_id).values_list(
+            'id', 'pub_date'
+        )[:settings.TIMELINE_BACKFILL]
+        entries.extend(
+            TimelineEntry(user=user, recipe_id=recipe_id,
+                          author_id=author_id, pub_date=pub_date)
+            for recipe_id, pub_date in recipes
+        )
+    TimelineEntry.objects.bulk_create(entries, ignore_conflicts=True)
+
+
+def trim_timeline(user, author_ids):
+    """Removes recipes of unfollowed authors with a single DELETE."""
+    TimelineEntry.objects.filter(
+        user=user, author_id__in=list(author_ids)
+    ).delete()
+
+
+def get_timeline(user):
+    """
+    Returns (recipe_id, pub_date) of recipes of followed authors,
+    newest first: materialized timeline entries united with recipes
+    of followed popular authors.
+    """
+    followed = list(Follow.objects.filter(user=user).values_list(
+        'author_id', flat=True
+    ))
+    _, popular = split_popular(followed)
+    timeline = Recipe.objects.filter(
+        timeline_entries__user=user
+    ).values_list('id', 'pub_date').order_by()
+    if popular:
+        timeline = timeline.union(
+            Recipe.objects.filter(
+                author_id__in=popular
+            ).values_list('id', 'pub_date').order_by()
+        )
+    return timeline.order_by('-pub_date', '-id')
@@ -0,0 +1,25 @@
+TO_TASTE = 'по вкусу'
+
+UNIT_CONVERSIONS = {
+    # normalized unit: (canonical unit, conversion factor)
+    'г': ('г', 1),
+    'гр': ('г', 1),
+    'кг': ('г', 1000),
+    'мл': ('мл', 1),
+    'л': ('мл', 1000),
+    'стакан': ('мл', 250),
+    'ст. л': ('мл', 15),
+    'ч. л': ('мл', 5),
+    'шт': ('шт.', 1),
+    TO_TASTE: (TO_TASTE, None),
+}
+
+
+def normalize_unit(unit):
+    """
+    Returns canonical unit and conversion factor for the
+    measurement unit of ingredient. Factor is None for units
+    without amount ("по вкусу"), unknown units are kept as is.
+    """
+    key = ' '.join(unit.lower().split()).rstrip('.')
+    return UNIT_CONVERSIONS.get(key, (unit, 1))
@@ -2,8 +2,10 @@ from django.conf.urls import include
 from django.urls import path
 from rest_framework.routers import DefaultRouter
 
-from .views import (FavoriteViewSet, IngredientViewSet, RecipeViewSet,
-                    ShoppingCartViewSet, TagViewSet, download_shopping_cart)
+from .views import (BulkFavoriteViewSet, BulkShoppingCartViewSet,
+                    FavoriteViewSet, IngredientViewSet, RecipeViewSet,
+                    ShoppingCartViewSet, ShoppingListView, TagViewSet,
+                    download_shopping_cart)
 
 v1_router = DefaultRouter()
 v1_router.register(r'tags', TagViewSet, basename='tags')
@@ -16,6 +18,21 @@ urlpatterns = [
         download_shopping_cart,
         name='download'
     ),
+    path(
+        'recipes/shopping_list/',
+        ShoppingListView.as_view(),
+        name='shopping_list'
+    ),
+    path(
+        'recipes/favorite/bulk/',
+        BulkFavoriteViewSet.as_view(),
+        name='favorite_bulk'
+    ),
+    path(
+        'recipes/shopping_cart/bulk/',
+        BulkShoppingCartViewSet.as_view(),
+        name='shopping_cart_bulk'
+    ),
     path(
         'recipes/<int:recipe_id>/favorite/',
         FavoriteViewSet.as_view(),
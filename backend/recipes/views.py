@@ -1,23 +1,41 @@
-from django.http import HttpResponse
-from django.shortcuts import get_object_or_404
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Exists, OuterRef
+from django.http import HttpResponse, StreamingHttpResponse
 from django_filters.rest_framework import DjangoFilterBackend
-from reportlab.pdfbase import pdfmetrics
-from reportlab.pdfbase.ttfonts import TTFont
-from reportlab.pdfgen import canvas
 from rest_framework import status, viewsets
-from rest_framework.decorators import api_view
-from rest_framework.permissions import AllowAny, IsAuthenticated
+from rest_framework.decorators import action
+from rest_framework.generics import get_object_or_404
+from rest_framework.permissions import (SAFE_METHODS, AllowAny,
+                                        IsAuthenticated)
+from rest_framework.renderers import JSONRenderer
 from rest_framework.response import Response
 from rest_framework.views import APIView
 
+from users.serializers import ShowRecipeAddedSerializer
+
+from foodgram.metrics import MetricsMixin
+
+from .catalogue import get_ingredients, get_tags
+from .concurrency import ConcurrencyLimitMixin
+from .facets import get_facets
+from .fast_serializers import (RECIPE_VALUES, serialize_ingredients,
+                               serialize_recipes)
 from .filters import RecipeFilter, IngredientFilter
-from .models import (Favorite, Ingredient, IngredientInRecipe, Recipe,
-                     ShoppingCart, Tag)
+from .ingredient_index import find_recipes
+from .models import Favorite, Ingredient, Recipe, ShoppingCart, Tag
 from .permissions import AdminOrAuthorOrReadOnly
-from .serializers import (CreateRecipeSerializer, FavoriteSerializer,
-                          IngredientSerializer, ShoppingCartSerializer,
-                          ShowRecipeSerializer, TagSerializer)
+from .serializers import (CookWithSerializer, CreateRecipeSerializer,
+                          FavoriteSerializer, IngredientSerializer,
+                          ShoppingCartSerializer, ShowRecipeSerializer,
+                          TagSerializer)
 from .paginators import PageNumberPaginatorModified
+from .relations import BulkRelationView, create_relation, delete_relation
+from .renderers import (ShoppingListCSVRenderer, ShoppingListJSONRenderer,
+                        ShoppingListPDFRenderer, ShoppingListTextRenderer)
+from .shopping_list import (add_to_shopping_list, get_buying_list,
+                            get_shopping_list, remove_from_shopping_list)
+from .timeline import get_timeline
 
 
 class TagViewSet(viewsets.ReadOnlyModelViewSet):
@@ -32,6 +50,11 @@ class TagViewSet(viewsets.ReadOnlyModelViewSet):
     permission_classes = [AllowAny, ]
     pagination_class = None
 
+    def list(self, request, *args, **kwargs):
+        if not settings.FAST_SERIALIZATION:
+            return super().list(request, *args, **kwargs)
+        return Response(get_tags())
+
 
 class IngredientViewSet(viewsets.ReadOnlyModelViewSet):
     """
@@ -47,8 +70,18 @@ class IngredientViewSet(viewsets.ReadOnlyModelViewSet):
     filterset_class = IngredientFilter
     pagination_class = None
 
+    def list(self, request, *args, **kwargs):
+        if not settings.FAST_SERIALIZATION:
+            return super().list(request, *args, **kwargs)
+        if not request.query_params:
+            return Response(get_ingredients())
+        return Response(
+            serialize_ingredients(self.filter_queryset(self.queryset))
+        )
+
 
-class RecipeViewSet(viewsets.ModelViewSet):
+class RecipeViewSet(MetricsMixin, ConcurrencyLimitMixin,
+                    viewsets.ModelViewSet):
     """
     Describes ViewSet, which provides get/post/delete/put methods
     to work with recipes
@@ -59,138 +92,341 @@ class RecipeViewSet(viewsets.ModelViewSet):
     filterset_class = RecipeFilter
     pagination_class = PageNumberPaginatorModified
 
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        if self.request.method != 'GET':
+            return queryset
+        return self.optimize_queryset(queryset)
+
+    @property
+    def throttle_scope(self):
+        if self.request.method in SAFE_METHODS:
+            return None
+        return 'write'
+
+    def get_concurrency_scope(self):
+        if self.action in ('create', 'update', 'partial_update'):
+            return 'recipe_write'
+        return None
+
     def get_serializer_class(self):
         if self.request.method == 'GET':
             return ShowRecipeSerializer
         return CreateRecipeSerializer
 
+    def get_serializer(self, *args, **kwargs):
+        if self.request.method == 'GET':
+            kwargs.update(self.get_fieldset_params())
+        return super().get_serializer(*args, **kwargs)
+
+    def get_fieldset_params(self):
+        """
+        Parses sparse fieldset query parameters:
+        ?fields=id,name,image&expand=author
+        """
+        params = {}
+        for param in ('fields', 'expand'):
+            value = self.request.query_params.get(param)
+            if value is not None:
+                params[param] = [name for name in value.split(',') if name]
+        return params
+
+    def optimize_queryset(self, queryset):
+        """
+        Fetches only the data, which is needed for requested fields:
+        defers text, prefetches tags and ingredients, joins author
+        and annotates user's favorite and shopping cart flags.
+        """
+        selected, expanded = ShowRecipeSerializer.get_fieldset(
+            **self.get_fieldset_params()
+        )
+        if 'text' not in selected:
+            queryset = queryset.defer('text')
+        if 'author' in expanded:
+            queryset = queryset.select_related('author')
+        if 'tags' in selected:
+            queryset = queryset.prefetch_related('tags')
+        if 'ingredients' in expanded:
+            queryset = queryset.prefetch_related(
+                'ingredientinrecipe_set__ingredient'
+            )
+        elif 'ingredients' in selected:
+            queryset = queryset.prefetch_related('ingredientinrecipe_set')
+        return self.annotate_user_flags(queryset, selected)
+
+    def annotate_user_flags(self, queryset, selected):
+        """Annotates favorited and in_shopping_cart flags if needed."""
+        user = self.request.user
+        if user.is_authenticated and 'is_favorited' in selected:
+            queryset = queryset.annotate(favorited=Exists(
+                Favorite.objects.filter(user=user, recipe=OuterRef('pk'))
+            ))
+        if user.is_authenticated and 'is_in_shopping_cart' in selected:
+            queryset = queryset.annotate(in_shopping_cart=Exists(
+                ShoppingCart.objects.filter(user=user, recipe=OuterRef('pk'))
+            ))
+        return queryset
+
+    def list(self, request, *args, **kwargs):
+        """
+        Full representation is assembled from stored recipe cards
+        (see recipes/fast_serializers.py), sparse fieldsets
+        are handled by ShowRecipeSerializer.
+        """
+        if not settings.FAST_SERIALIZATION or self.get_fieldset_params():
+            return super().list(request, *args, **kwargs)
+        queryset = self.annotate_user_flags(
+            self.filter_queryset(super().get_queryset()),
+            ShowRecipeSerializer.Meta.fields
+        )
+        values = [*RECIPE_VALUES, *queryset.query.annotations]
+        page = self.paginate_queryset(queryset.values(*values))
+        return self.get_paginated_response(serialize_recipes(page, request))
+
+    def retrieve(self, request, *args, **kwargs):
+        if not settings.FAST_SERIALIZATION or self.get_fieldset_params():
+            return super().retrieve(request, *args, **kwargs)
+        queryset = self.annotate_user_flags(
+            self.filter_queryset(super().get_queryset()),
+            ShowRecipeSerializer.Meta.fields
+        )
+        values = [*RECIPE_VALUES, *queryset.query.annotations]
+        row = get_object_or_404(queryset.values(*values), pk=kwargs['pk'])
+        # permissions check the author, so the row is enough to build one
+        self.check_object_permissions(
+            request, Recipe(id=row['id'], author_id=row['author_id'])
+        )
+        return Response(serialize_recipes([row], request)[0])
+
+    def serialize_page(self, recipe_ids):
+        """
+        Returns representation of the recipes in the given order,
+        loaded with the same queries as a page of the list.
+        """
+        if not settings.FAST_SERIALIZATION or self.get_fieldset_params():
+            recipes = self.optimize_queryset(
+                Recipe.objects.all()
+            ).in_bulk(recipe_ids)
+            return self.get_serializer([
+                recipes[recipe_id] for recipe_id in recipe_ids
+                if recipe_id in recipes
+            ], many=True).data
+        queryset = self.annotate_user_flags(
+            Recipe.objects.filter(id__in=recipe_ids),
+            ShowRecipeSerializer.Meta.fields
+        )
+        values = [*RECIPE_VALUES, *queryset.query.annotations]
+        rows = {row['id']: row for row in queryset.values(*values)}
+        return serialize_recipes([
+            rows[recipe_id] for recipe_id in recipe_ids
+            if recipe_id in rows
+        ], self.request)
+
     def get_serializer_context(self):
         context = super().get_serializer_context()
         context.update({'request': self.request})
         return context
 
+    @action(detail=False, url_path='cook_with')
+    def cook_with(self, request):
+        """
+        Lists recipes by ingredients the user has:
+        /api/recipes/cook_with/?ingredients=1&ingredients=2&max_missing=1
+        Recipes with more matched ingredients go first.
+        """
+        params = CookWithSerializer(data={
+            'ingredients': request.query_params.getlist('ingredients'),
+            'max_missing': request.query_params.get('max_missing', 0),
+        })
+        params.is_valid(raise_exception=True)
+        page = self.paginate_queryset(find_recipes(**params.validated_data))
+        return self.get_paginated_response(
+            self.serialize_page([recipe_id for recipe_id, *_ in page])
+        )
+
+    @action(detail=False)
+    def facets(self, request):
+        """
+        Counts recipes matching the current filters in total,
+        per tag and per cooking time bucket:
+        /api/recipes/facets/?tags=breakfast&is_favorited=1
+        """
+        return Response(get_facets(request))
+
+    @action(detail=False, permission_classes=[IsAuthenticated, ])
+    def timeline(self, request):
+        """
+        Lists recipes of followed authors, newest first.
+        """
+        page = self.paginate_queryset(get_timeline(request.user))
+        return self.get_paginated_response(
+            self.serialize_page([recipe_id for recipe_id, _ in page])
+        )
+
+    @action(detail=True)
+    def similar(self, request, pk=None):
+        """
+        Lists precomputed similar recipes, most similar first.
+        """
+        recipe = get_object_or_404(Recipe.objects.only('id'), pk=pk)
+        recipes = Recipe.objects.filter(
+            similar_for__recipe=recipe
+        ).order_by('-similar_for__score')
+        serializer = ShowRecipeAddedSerializer(
+            recipes,
+            many=True,
+            context={'request': request}
+        )
+        return Response(serializer.data)
+
 
-class FavoriteViewSet(APIView):
+class FavoriteViewSet(MetricsMixin, APIView):
     """
     Describes ViewSet to add and delete Favorite recipes
     """
 
     permission_classes = [IsAuthenticated, ]
+    throttle_scope = 'write'
 
     def get(self, request, recipe_id):
-        user = request.user
-        data = {
-            "user": user.id,
-            "recipe": recipe_id,
-        }
-        if Favorite.objects.filter(user=user, recipe__id=recipe_id).exists():
+        recipe = get_object_or_404(Recipe, id=recipe_id)
+        favorite = create_relation(Favorite, user=request.user, recipe=recipe)
+        if favorite is None:
             return Response(
                 {"Fail": "Уже в избранном"},
                 status=status.HTTP_400_BAD_REQUEST
             )
-        serializer = FavoriteSerializer(
-            data=data,
-            context={"request": request}
-        )
-        if not serializer.is_valid():
-            return Response(
-                serializer.errors,
-                status=status.HTTP_400_BAD_REQUEST
-            )
-        serializer.save()
+        serializer = FavoriteSerializer(favorite, context={"request": request})
         return Response(serializer.data, status=status.HTTP_201_CREATED)
 
     def delete(self, request, recipe_id):
-        user = request.user
-        recipe = get_object_or_404(Recipe, id=recipe_id)
-        if not Favorite.objects.filter(user=user, recipe=recipe).exists():
+        if not delete_relation(Favorite, user=request.user,
+                               recipe_id=recipe_id):
+            get_object_or_404(Recipe, id=recipe_id)
             return Response(status=status.HTTP_400_BAD_REQUEST)
-        Favorite.objects.get(user=user, recipe=recipe).delete()
         return Response(status=status.HTTP_204_NO_CONTENT)
 
 
-class ShoppingCartViewSet(APIView):
+class ShoppingCartViewSet(MetricsMixin, APIView):
     """
     Describes ViewSet to add and delete recipes to/from shopping cart
     """
     permission_classes = [IsAuthenticated, ]
+    throttle_scope = 'write'
 
     def get(self, request, recipe_id):
-        user = request.user
-        data = {
-            "user": user.id,
-            "recipe": recipe_id,
-        }
-        shopping_cart_exist = ShoppingCart.objects.filter(
-            user=user,
-            recipe__id=recipe_id
-        ).exists()
-        if shopping_cart_exist:
+        recipe = get_object_or_404(Recipe, id=recipe_id)
+        with transaction.atomic():
+            shopping_cart = create_relation(
+                ShoppingCart,
+                user=request.user,
+                recipe=recipe
+            )
+            if shopping_cart is not None:
+                add_to_shopping_list(request.user.id, [recipe.id])
+        if shopping_cart is None:
             return Response(
                 {"Fail": "Уже в корзине"},
                 status=status.HTTP_400_BAD_REQUEST
             )
         context = {'request': request}
-        serializer = ShoppingCartSerializer(data=data, context=context)
-        if not serializer.is_valid():
-            return Response(
-                serializer.errors,
-                status=status.HTTP_400_BAD_REQUEST
-            )
-        serializer.save()
+        serializer = ShoppingCartSerializer(shopping_cart, context=context)
         return Response(serializer.data, status=status.HTTP_201_CREATED)
 
     def delete(self, request, recipe_id):
-        user = request.user
-        recipe = get_object_or_404(Recipe, id=recipe_id)
-        if not ShoppingCart.objects.filter(user=user, recipe=recipe).exists():
+        with transaction.atomic():
+            deleted = delete_relation(ShoppingCart, user=request.user,
+                                      recipe_id=recipe_id)
+            if deleted:
+                remove_from_shopping_list(request.user.id, [recipe_id])
+        if not deleted:
+            get_object_or_404(Recipe, id=recipe_id)
             return Response(status=status.HTTP_400_BAD_REQUEST)
-        ShoppingCart.objects.get(user=user, recipe=recipe).delete()
         return Response(status=status.HTTP_204_NO_CONTENT)
 
 
-@api_view(['GET'])
-def download_shopping_cart(request):
+class BulkFavoriteViewSet(BulkRelationView):
+    """
+    Describes View to add and delete many Favorite recipes at once
+    """
+    model = Favorite
+    target_model = Recipe
+    target_field = 'recipe'
+
+
+class BulkShoppingCartViewSet(BulkRelationView):
+    """
+    Describes View to add and delete many recipes to/from shopping cart
+    """
+    model = ShoppingCart
+    target_model = Recipe
+    target_field = 'recipe'
+
+    def after_add(self, user, target_ids):
+        add_to_shopping_list(user.id, target_ids)
+
+    def after_remove(self, user, target_ids):
+        remove_from_shopping_list(user.id, target_ids)
+
+
+class ShoppingListView(MetricsMixin, APIView):
+    """
+    Describes View, which returns ingredients of the recipes
+    in shopping cart with summarized amount and number of recipes
+    they come from. The list is read from ShoppingListItem table,
+    which is kept up to date on every change of the cart.
+    """
+    permission_classes = [IsAuthenticated, ]
+
+    def get(self, request):
+        return Response(get_shopping_list(request.user))
+
+
+class DownloadShoppingCart(MetricsMixin, ConcurrencyLimitMixin, APIView):
     """
-    Describes View-function, which allows to download a PDF file
-    listing the ingredients that are present in the recipes that
+    Describes View, which allows to download a file listing
+    the ingredients that are present in the recipes that
     are added to shopping cart
     with name, measurement units and
     summarized amount of those ingredients.
+    Format is chosen by Accept header or ?format= parameter:
+    pdf (default), txt, csv or json.
+    Text formats are streamed, errors are always returned as JSON.
     """
-
-    user = request.user
-    shopping_cart = user.shopping_cart.all()
-    buying_list = {}
-    for record in shopping_cart:
-        recipe = record.recipe
-        ingredients = IngredientInRecipe.objects.filter(recipe=recipe)
-        for ingredient in ingredients:
-            amount = ingredient.amount
-            name = ingredient.ingredient.name
-            measurement_unit = ingredient.ingredient.measurement_unit
-            if name not in buying_list:
-                buying_list[name] = {
-                    'measurement_unit': measurement_unit,
-                    'amount': amount
-                }
-            else:
-                buying_list[name]['amount'] = (buying_list[name]['amount']
-                                               + amount)
     file_name = 'buying_list'
-    pdfmetrics.registerFont(TTFont('DejaVuSerif', 'DejaVuSerif.ttf'))
-    response = HttpResponse(content_type='application/pdf')
-    response['Content-Disposition'] = f'attachment; filename="{file_name}.pdf"'
-    p = canvas.Canvas(response)
-    p.setFont('DejaVuSerif', 15)
-    height = 800
-    for name, data in buying_list.items():
-        p.drawString(
-            50,
-            height,
-            f"{name} ({data['measurement_unit']}) - {data['amount']}"
+    concurrency_scope = 'download'
+    throttle_scope = 'download'
+    permission_classes = [IsAuthenticated, ]
+    renderer_classes = [
+        ShoppingListPDFRenderer,
+        ShoppingListTextRenderer,
+        ShoppingListCSVRenderer,
+        ShoppingListJSONRenderer,
+    ]
+
+    def get(self, request):
+        buying_list = get_buying_list(request.user)
+        renderer = request.accepted_renderer
+        if renderer.streaming:
+            response = StreamingHttpResponse(
+                renderer.iter_render(buying_list),
+                content_type=f'{renderer.media_type}; '
+                             f'charset={renderer.charset}'
+            )
+        else:
+            response = HttpResponse(
+                renderer.render(buying_list),
+                content_type=renderer.media_type
+            )
+        response['Content-Disposition'] = (
+            f'attachment; filename="{self.file_name}.{renderer.format}"'
         )
-        height -= 25
-    p.showPage()
-    p.save()
-    return response
+        return response
+
+    def handle_exception(self, exc):
+        self.request.accepted_renderer = JSONRenderer()
+        self.request.accepted_media_type = JSONRenderer.media_type
+        return super().handle_exception(exc)
+
+
+download_shopping_cart = DownloadShoppingCart.as_view()
@@ -1,20 +1,46 @@
 from django.contrib import admin
 
+from recipes.admin import LargeTableAdmin
+from recipes.timeline import backfill_timeline, trim_timeline
+
 from .models import CustomUser, Follow
 
 
-class CustomUserAdmin(admin.ModelAdmin):
+class CustomUserAdmin(LargeTableAdmin):
     list_display = ('id', 'username', 'email',
                     'first_name', 'last_name', 'is_staff'
                     )
-    list_filter = ('email', 'username')
-    search_fields = ('username',)
+    list_filter = ('is_staff', 'is_active')
+    search_fields = ('username', 'email')
     empty_value_display = '---'
 
 
-class FollowAdmin(admin.ModelAdmin):
+class FollowAdmin(LargeTableAdmin):
     list_display = ('id', 'user', 'author', 'created_at')
+    list_select_related = ('user', 'author')
     list_filter = ('created_at', )
+    search_fields = ('user__email', 'author__email', 'author__username')
+    autocomplete_fields = ('user', 'author')
+
+    def save_model(self, request, obj, form, change):
+        super().save_model(request, obj, form, change)
+        old_user_id = form.initial.get('user', obj.user_id)
+        old_author_id = form.initial.get('author', obj.author_id)
+        trim_timeline(old_user_id, [old_author_id])
+        backfill_timeline(obj.user, [obj.author_id])
+
+    def delete_model(self, request, obj):
+        super().delete_model(request, obj)
+        trim_timeline(obj.user_id, [obj.author_id])
+
+    def delete_queryset(self, request, queryset):
+        author_ids = {}
+        for user_id, author_id in queryset.values_list('user_id',
+                                                       'author_id'):
+            author_ids.setdefault(user_id, []).append(author_id)
+        super().delete_queryset(request, queryset)
+        for user_id, user_author_ids in author_ids.items():
+            trim_timeline(user_id, user_author_ids)
 
 
 admin.site.register(CustomUser, CustomUserAdmin)
@@ -0,0 +1,16 @@
+from django.conf import settings
+from django.contrib.auth.hashers import PBKDF2PasswordHasher
+
+
+class ConfigurablePBKDF2PasswordHasher(PBKDF2PasswordHasher):
+    """
+    PBKDF2 hasher, which takes the number of iterations from
+    settings.PASSWORD_HASH_ITERATIONS.
+    It keeps the stock 'pbkdf2_sha256' algorithm name, so existing
+    hashes stay valid and are transparently rehashed with the
+    configured cost on the next successful login.
+    """
+
+    @property
+    def iterations(self):
+        return settings.PASSWORD_HASH_ITERATIONS
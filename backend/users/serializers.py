@@ -66,6 +66,8 @@ class ShowRecipeAddedSerializer(serializers.ModelSerializer):
         read_only_fields = fields
 
     def get_image(self, obj):
+        if not obj.image:
+            return None
         request = self.context.get('request')
         photo_url = obj.image.url
         return request.build_absolute_uri(photo_url)
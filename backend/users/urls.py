@@ -1,7 +1,8 @@
 from django.conf.urls import include
 from django.urls import path
 
-from .views import FollowViewSet, ListFollowViewSet, logout, obtain_auth_token
+from .views import (BulkFollowViewSet, FollowViewSet, ListFollowViewSet,
+                    logout, obtain_auth_token)
 
 urlpatterns = [
     path(
@@ -9,6 +10,11 @@ urlpatterns = [
         ListFollowViewSet.as_view(),
         name='subscriptions'
     ),
+    path(
+        'users/subscribe/bulk/',
+        BulkFollowViewSet.as_view(),
+        name='subscribe_bulk'
+    ),
     path('', include('djoser.urls')),
     path('auth/token/login/', obtain_auth_token, name='login'),
     path('auth/token/logout/', logout, name='logout'),
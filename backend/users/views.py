@@ -1,14 +1,27 @@
+from django.conf import settings
 from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.http import Http404
 from django.shortcuts import get_object_or_404
 from rest_framework import generics, status
 from rest_framework.authtoken import views as auth_views
 from rest_framework.compat import coreapi, coreschema
+from rest_framework.exceptions import Throttled, ValidationError
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
 from rest_framework.schemas import ManualSchema
+from rest_framework.settings import api_settings
 from rest_framework.views import APIView
 from rest_framework.authtoken.models import Token
 
+from foodgram.metrics import MetricsMixin
+from recipes.fast_serializers import (annotate_subscriptions,
+                                      serialize_subscriptions)
+from recipes.relations import (BulkRelationView, create_relation,
+                               delete_relation)
+from recipes.timeline import backfill_timeline, trim_timeline
+
+from .limiters import LoginAttemptLimiter
 from .models import Follow
 from .serializers import (FollowSerializer, MyAuthTokenSerializer,
                           ShowFollowSerializer)
@@ -16,16 +29,25 @@ from .serializers import (FollowSerializer, MyAuthTokenSerializer,
 User = get_user_model()
 
 
-class Logout(APIView):
+class Logout(MetricsMixin, APIView):
     """Logout option"""
+    throttle_scope = 'auth'
 
     def post(self, request):
         request.user.auth_token.delete()
         return Response(status=status.HTTP_204_NO_CONTENT)
 
 
-class MyAuthToken(auth_views.ObtainAuthToken):
+class MyAuthToken(MetricsMixin, auth_views.ObtainAuthToken):
+    """
+    Issues auth tokens by email-password combination.
+    Failed attempts are counted per email and per IP,
+    and blocked clients get 429 before any password hashing.
+    """
     serializer_class = MyAuthTokenSerializer
+    limiter_class = LoginAttemptLimiter
+    throttle_classes = api_settings.DEFAULT_THROTTLE_CLASSES
+    throttle_scope = 'auth'
     if coreapi is not None and coreschema is not None:
         schema = ManualSchema(
             fields=[
@@ -52,8 +74,16 @@ class MyAuthToken(auth_views.ObtainAuthToken):
         )
 
     def post(self, request, *args, **kwargs):
+        limiter = self.limiter_class()
+        email = str(request.data.get('email', ''))
+        ip = limiter.get_ident(request)
+        if limiter.is_blocked(email, ip):
+            raise Throttled(wait=limiter.timeout)
         serializer = self.get_serializer(data=request.data)
-        serializer.is_valid(raise_exception=True)
+        if not serializer.is_valid():
+            limiter.register_failure(email, ip)
+            raise ValidationError(serializer.errors)
+        limiter.reset(email)
         user = serializer.validated_data['user']
         token, created = Token.objects.get_or_create(user=user)
         return Response({'auth_token': token.key})
@@ -73,45 +103,84 @@ class ListFollowViewSet(generics.ListAPIView):
         user = self.request.user
         return User.objects.filter(following__user=user)
 
+    def list(self, request, *args, **kwargs):
+        """
+        Subscriptions are built by the fast path
+        (see recipes/fast_serializers.py).
+        """
+        if not settings.FAST_SERIALIZATION:
+            return super().list(request, *args, **kwargs)
+        queryset = annotate_subscriptions(
+            self.filter_queryset(self.get_queryset())
+        )
+        page = self.paginate_queryset(queryset)
+        if page is None:
+            return Response(serialize_subscriptions(queryset, request))
+        return self.get_paginated_response(
+            serialize_subscriptions(page, request)
+        )
+
 
-class FollowViewSet(APIView):
+class FollowViewSet(MetricsMixin, APIView):
     """
     APIView with post and delete options.
     Used to create and delete Follow objects.
     """
     permission_classes = [IsAuthenticated, ]
+    throttle_scope = 'write'
 
     def get(self, request, author_id):
         user = request.user
-        follow_exist = Follow.objects.filter(
-            user=user,
-            author__id=author_id
-        ).exists()
-        if user.id == author_id or follow_exist:
+        if user.id == author_id:
             return Response(
                 {"Fail": "Ошибка"},
                 status=status.HTTP_400_BAD_REQUEST
             )
-        data = {
-            'user': user.id,
-            'author': author_id
-        }
-        serializer = FollowSerializer(data=data, context={'request': request})
-        if not serializer.is_valid():
+        author = get_object_or_404(User, id=author_id)
+        with transaction.atomic():
+            follow = create_relation(Follow, user=user, author=author)
+            if follow is not None:
+                backfill_timeline(user, [author.id])
+        if follow is None:
             return Response(
-                serializer.errors,
+                {"Fail": "Ошибка"},
                 status=status.HTTP_400_BAD_REQUEST
             )
-        serializer.save()
+        serializer = FollowSerializer(follow, context={'request': request})
         return Response(serializer.data, status=status.HTTP_201_CREATED)
 
     def delete(self, request, author_id):
-        user = request.user
-        author = get_object_or_404(User, id=author_id)
-        obj = get_object_or_404(Follow, user=user, author=author)
-        obj.delete()
+        with transaction.atomic():
+            deleted = delete_relation(Follow, user=request.user,
+                                      author_id=author_id)
+            if deleted:
+                trim_timeline(request.user, [author_id])
+        if not deleted:
+            raise Http404
         return Response(status=status.HTTP_204_NO_CONTENT)
 
 
+class BulkFollowViewSet(BulkRelationView):
+    """
+    APIView to subscribe to and unsubscribe from many authors at once.
+    """
+    SELF_FOLLOW = 'self_follow'
+
+    model = Follow
+    target_model = User
+    target_field = 'author'
+
+    def check_target(self, request, target_id):
+        if target_id == request.user.id:
+            return self.SELF_FOLLOW
+        return None
+
+    def after_add(self, user, target_ids):
+        backfill_timeline(user, target_ids)
+
+    def after_remove(self, user, target_ids):
+        trim_timeline(user, target_ids)
+
+
 logout = Logout.as_view()
 obtain_auth_token = MyAuthToken.as_view()